@@ -0,0 +1,32 @@
+# build a delta patch between two launcher executables and check that it
+# rebuilds the new one
+# usage: python make_delta.py <old executable> <new executable> <output>
+import hashlib
+import os
+import sys
+import tempfile
+
+sys.path.insert(0, "./src")
+from delta import apply_delta, make_delta  # noqa: E402
+
+if len(sys.argv) != 4:
+    print("Usage: python make_delta.py <old executable> <new executable> <output>")
+    sys.exit(1)
+old_path, new_path, output_path = sys.argv[1:]
+with open(old_path, "rb") as f:
+    old = f.read()
+with open(new_path, "rb") as f:
+    new = f.read()
+
+delta = make_delta(old, new)
+with tempfile.TemporaryDirectory() as temp_dir:
+    rebuilt_path = os.path.join(temp_dir, "rebuilt")
+    if apply_delta(delta, old_path, rebuilt_path) != hashlib.sha256(new).hexdigest():
+        print("Delta doesn't rebuild the new executable")
+        sys.exit(1)
+if len(delta) >= len(new) * 0.8:
+    print(f"Delta is {len(delta)} bytes, not worth publishing")
+    sys.exit(0)
+with open(output_path, "wb") as f:
+    f.write(delta)
+print(f"Delta written to {output_path}: {len(delta)} of {len(new)} bytes")
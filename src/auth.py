@@ -1,10 +1,15 @@
 import asyncio
+import logging
 import re
 import os
 import json
+import time
+import base64
 import httpx
 import hashlib
 
+import skin_renderer
+
 from config import (
     AUTH_URL,
     ACCOUNT_FILE,
@@ -13,14 +18,33 @@ from config import (
     SKINS_CACHE_FOLDER,
 )
 
+# Renders of other skins are evicted, least recently used first, past this size
+SKINS_CACHE_MAX_SIZE = 16 * 1024 * 1024
+SKINS_ETAGS_FILE = SKINS_CACHE_FOLDER / "etags.json"
+# Raw skin and cape textures, named by their hash on the auth server
+SKINS_TEXTURES_FOLDER = SKINS_CACHE_FOLDER / "textures"
+# Access tokens are refreshed this many seconds before they expire
+TOKEN_REFRESH_MARGIN = 10 * 60
+# Lifetime assumed for access tokens that don't carry an expiry
+TOKEN_REFRESH_INTERVAL = 12 * 60 * 60
+# Longest sleep of the refresh task, so logins and failures are picked up
+TOKEN_CHECK_INTERVAL = 5 * 60
+# Shortest sleep after a refresh, for tokens issued with a short or past expiry
+TOKEN_MIN_REFRESH_INTERVAL = 60
+
 class Auth:
     def __init__(self):
         self.base_url = AUTH_URL
         self.skin_url = SKIN_RENDER_URL
         self.account = {}
         self.user = {}
-        self.yggdrasil_session = httpx.Client()
-        self.api_session = httpx.Client()
+        self.yggdrasil_session = httpx.AsyncClient(timeout=10)
+        self.api_session = httpx.AsyncClient(timeout=10)
+        self._refresh_lock = asyncio.Lock()
+        self.skin_session = httpx.AsyncClient(timeout=10)
+        self.update_skin = False
+        # set by the main page while Minecraft runs
+        self.game_process: asyncio.subprocess.Process | None = None
         self.load_account()
         self.load_user()
 
@@ -58,10 +82,13 @@ class Auth:
             if player.get("capeUrl")
             else "none"
         )
-        self.skin_hash = hashlib.md5(f"{skin_hash}{cape_hash}".encode()).hexdigest()
+        skin_model = player.get("skinModel", "classic")
+        self.skin_hash = hashlib.md5(
+            f"{skin_hash}{cape_hash}{skin_model}".encode()
+        ).hexdigest()
 
-    def register(self, username: str, password: str):
-        resp = self.api_session.post(
+    async def register(self, username: str, password: str):
+        resp = await self.api_session.post(
             f"{self.base_url}/web/register",
             params={
                 "playerName": username,
@@ -76,11 +103,12 @@ class Auth:
             return err.replace("+", " ")
         return "Помилка сервера або відсутній інтернет"
 
-    def login(self, username: str, password: str):
-        api_resp = self.__login(username, password)
+    async def login(self, username: str, password: str):
+        # a game token is only issued once the launcher API accepts the login
+        api_resp = await self.__login(username, password)
         if api_resp.status_code != 200:
             return api_resp
-        resp = self.yggdrasil_session.post(
+        resp = await self.yggdrasil_session.post(
             f"{self.base_url}/authenticate",
             json={
                 "agent": {"name": "Minecraft", "version": 1},
@@ -97,50 +125,102 @@ class Auth:
                 "access_token": data["accessToken"],
                 "client_token": data["clientToken"],
                 "username": data["selectedProfile"]["name"],
+                "token_expires_at": self._get_token_expiry(data["accessToken"]),
             }
         )
         self.save_account()
         return resp
 
-    def refresh(self):
-        resp = self.yggdrasil_session.post(
-            f"{self.base_url}/refresh",
-            json={
-                "accessToken": self.account.get("access_token"),
-                "clientToken": self.account.get("client_token"),
-                "requestUser": True,
-            },
-        )
-        if resp.status_code != 200:
-            return "Помилка сервера або відсутній інтернет"
-        data = resp.json()
-        self.account.update(
-            {
-                "access_token": data["accessToken"],
-                "client_token": data["clientToken"],
-            }
-        )
-        self.save_account()
-        return data
+    async def refresh(self):
+        # concurrent callers wait for the refresh already in flight
+        token = self.account.get("access_token")
+        async with self._refresh_lock:
+            if self.account.get("access_token") != token:
+                return self.account
+            try:
+                resp = await self.yggdrasil_session.post(
+                    f"{self.base_url}/refresh",
+                    json={
+                        "accessToken": token,
+                        "clientToken": self.account.get("client_token"),
+                        "requestUser": True,
+                    },
+                )
+            except httpx.HTTPError:
+                return "Помилка сервера або відсутній інтернет"
+            if resp.status_code != 200:
+                return "Помилка сервера або відсутній інтернет"
+            data = resp.json()
+            self.account.update(
+                {
+                    "access_token": data["accessToken"],
+                    "client_token": data["clientToken"],
+                    "token_expires_at": self._get_token_expiry(data["accessToken"]),
+                }
+            )
+            self.save_account()
+            return data
+
+    @staticmethod
+    def _get_token_expiry(token: str) -> float:
+        """
+        Expiry of a JWT access token, or the assumed lifetime for opaque ones.
+        """
+        try:
+            payload = token.split(".")[1]
+            payload += "=" * (-len(payload) % 4)
+            return float(json.loads(base64.urlsafe_b64decode(payload))["exp"])
+        except (IndexError, ValueError, KeyError, TypeError):
+            return time.time() + TOKEN_REFRESH_INTERVAL
+
+    async def keep_token_fresh(self):
+        """
+        Refresh the access token ahead of its expiry, so launching the game
+        never has to wait for it. Nothing is refreshed while the game runs.
+        """
+        while True:
+            delay = TOKEN_CHECK_INTERVAL
+            if self.account.get("access_token"):
+                if not self.account.get("token_expires_at"):
+                    # accounts saved before expiry tracking
+                    self.account["token_expires_at"] = self._get_token_expiry(
+                        self.account["access_token"]
+                    )
+                    self.save_account()
+                until_refresh = (
+                    self.account["token_expires_at"] - TOKEN_REFRESH_MARGIN - time.time()
+                )
+                if until_refresh > 0:
+                    delay = min(until_refresh, TOKEN_CHECK_INTERVAL)
+                elif self._game_running():
+                    # a refresh invalidates the token the running game joins
+                    # servers with, wait until it exits
+                    pass
+                elif not isinstance(await self.refresh(), str):
+                    delay = TOKEN_MIN_REFRESH_INTERVAL
+            await asyncio.sleep(delay)
 
-    async def avalidate(self):
-        return await asyncio.to_thread(self.validate)
+    def _game_running(self) -> bool:
+        return self.game_process is not None and self.game_process.returncode is None
 
-    def validate(self):
+    async def validate(self):
         token = self.account.get("access_token")
         if not token:
             return False
-        resp = self.yggdrasil_session.post(
-            f"{self.base_url}/validate",
-            json={
-                "accessToken": token,
-                "clientToken": self.account.get("client_token"),
-            },
-        )
+        try:
+            resp = await self.yggdrasil_session.post(
+                f"{self.base_url}/validate",
+                json={
+                    "accessToken": token,
+                    "clientToken": self.account.get("client_token"),
+                },
+            )
+        except httpx.HTTPError:
+            return False
         return resp.status_code == 204
 
-    def signout(self, password: str):
-        resp = self.yggdrasil_session.post(
+    async def signout(self, password: str):
+        resp = await self.yggdrasil_session.post(
             f"{self.base_url}/signout",
             json={
                 "username": self.account.get("username"),
@@ -149,8 +229,8 @@ class Auth:
         )
         return resp.status_code == 204
 
-    def invalidate(self):
-        resp = self.yggdrasil_session.post(
+    async def invalidate(self):
+        resp = await self.yggdrasil_session.post(
             f"{self.base_url}/invalidate",
             json={
                 "accessToken": self.account.get("access_token"),
@@ -162,8 +242,8 @@ class Auth:
         self.save_account()
         return resp.status_code == 204
 
-    def logout(self):
-        self.invalidate()
+    async def logout(self):
+        await self.invalidate()
         self.account.clear()
         self.user.clear()
         old_skin_hash = self.skin_hash
@@ -177,8 +257,8 @@ class Auth:
                 if os.path.exists(path):
                     os.remove(path)
 
-    def __login(self, username, password):
-        resp = self.api_session.post(
+    async def __login(self, username, password):
+        resp = await self.api_session.post(
             f"{self.base_url}/drasl/api/v2/login",
             json={"username": username, "password": password},
         )
@@ -193,27 +273,33 @@ class Auth:
         self.calculate_skin_hash()
         return resp
 
-    async def aget_user(self):
-        return await asyncio.to_thread(self.get_user)
-
-    def get_user(self):
-        resp = self.api_session.get(f"{self.base_url}/drasl/api/v2/user")
+    async def get_user(self):
+        try:
+            resp = await self.api_session.get(f"{self.base_url}/drasl/api/v2/user")
+        except httpx.HTTPError:
+            return False
+        if resp.status_code != 200:
+            return False
         data = resp.json()
         player = self.user.get("user", {}).get("players", [{}])[0]
         new_player = data.get("players", [{}])[0]
-        self.update_skin = player.get("skinUrl") != new_player.get(
-            "skinUrl"
-        ) or player.get("capeUrl") != new_player.get("capeUrl")
+        self.update_skin = (
+            player.get("skinUrl") != new_player.get("skinUrl")
+            or player.get("capeUrl") != new_player.get("capeUrl")
+            or player.get("skinModel") != new_player.get("skinModel")
+        )
         self.user.setdefault("user", {}).update(data)
         self.save_user()
         return True
 
-    def update_user(self, data):
-        return self.api_session.patch(f"{self.base_url}/drasl/api/v2/user", json=data)
+    async def update_user(self, data):
+        return await self.api_session.patch(
+            f"{self.base_url}/drasl/api/v2/user", json=data
+        )
 
-    def update_player(self, data):
+    async def update_player(self, data):
         uuid = self.user.get("user", {}).get("players", [{}])[0].get("uuid")
-        resp = self.api_session.patch(
+        resp = await self.api_session.patch(
             f"{self.base_url}/drasl/api/v2/players/{uuid}",
             json=data,
         )
@@ -224,8 +310,8 @@ class Auth:
         self.calculate_skin_hash()
         return resp
 
-    def delete_user(self):
-        resp = self.api_session.delete(f"{self.base_url}/drasl/api/v2/user")
+    async def delete_user(self):
+        resp = await self.api_session.delete(f"{self.base_url}/drasl/api/v2/user")
         return resp.text
 
     def is_valid_nickname(self, nickname):
@@ -238,27 +324,151 @@ class Auth:
             f"{SKINS_CACHE_FOLDER}/{self.skin_hash}-back.png",
         ]
         if all(os.path.exists(f) for f in skin_files) and not self.update_skin:
+            # mark as recently used for the cache eviction
+            for skin_file in skin_files:
+                os.utime(skin_file)
+            return
+        if await self._render_skin_locally(skin_files):
+            self._evict_skin_cache(keep=skin_files)
+            self.update_skin = False
             return
         uuid = self.user.get("user", {}).get("players", [{}])[0].get("uuid")
         face = f"{self.skin_url}/avatars/{uuid}"
         player = f"{self.skin_url}/player/{uuid}"
         player_back = f"{self.skin_url}/player-back/{uuid}"
         skin_list = [face, player, player_back]
-        for skin_file, skin_url in zip(skin_files, skin_list):
-            if not os.path.exists(skin_file):
-                resp = await self.__render_skin(skin_url)
-                if resp.status_code != 200:
-                    return
-                with open(skin_file, "wb") as f:
-                    f.write(resp.content)
-        self.update_skin = False
+        etags = self._load_skin_etags()
+        results = await asyncio.gather(
+            *(
+                self.__render_skin(skin_file, skin_url, etags)
+                for skin_file, skin_url in zip(skin_files, skin_list)
+            )
+        )
+        self._save_skin_etags(etags)
+        self._evict_skin_cache(keep=skin_files)
+        if all(results):
+            self.update_skin = False
 
-    async def __render_skin(self, skin_url):
-        async with httpx.AsyncClient() as client:
-            resp = await client.get(skin_url)
-            if resp.status_code != 200:
-                return resp
-            return resp
+    async def _render_skin_locally(self, skin_files):
+        """
+        Render the previews from the skin and cape textures. Textures are
+        content addressed, so once downloaded this works offline.
+        Returns False when the remote render service should be used instead.
+        """
+        player = self.user.get("user", {}).get("players", [{}])[0]
+        if not player.get("skinUrl"):
+            return False
+        texture_urls = [player["skinUrl"]]
+        if player.get("capeUrl"):
+            texture_urls.append(player["capeUrl"])
+        textures = await asyncio.gather(
+            *(self._get_texture(url) for url in texture_urls)
+        )
+        if not all(textures):
+            return False
+        try:
+            await asyncio.to_thread(
+                self._write_renders,
+                skin_files,
+                textures[0],
+                textures[1] if len(textures) > 1 else None,
+                player.get("skinModel") == "slim",
+            )
+        except ValueError as e:
+            logging.info(f"Local skin render failed, using render service: {e}")
+            return False
+        return True
+
+    async def _get_texture(self, texture_url):
+        texture_file = SKINS_TEXTURES_FOLDER / texture_url.split("/")[-1]
+        if texture_file.exists():
+            os.utime(texture_file)
+            return texture_file
+        try:
+            resp = await self.skin_session.get(texture_url)
+        except httpx.HTTPError:
+            return None
+        if resp.status_code != 200:
+            return None
+        SKINS_TEXTURES_FOLDER.mkdir(parents=True, exist_ok=True)
+        with open(texture_file, "wb") as f:
+            f.write(resp.content)
+        return texture_file
+
+    @staticmethod
+    def _write_renders(skin_files, skin_file, cape_file, slim):
+        with open(skin_file, "rb") as f:
+            skin = skin_renderer.decode_png(f.read())
+        cape = None
+        if cape_file is not None:
+            with open(cape_file, "rb") as f:
+                cape = skin_renderer.decode_png(f.read())
+        renders = [
+            skin_renderer.render_face(skin),
+            skin_renderer.render_body(skin, slim=slim),
+            skin_renderer.render_body(skin, slim=slim, cape=cape, back=True),
+        ]
+        for path, render in zip(skin_files, renders):
+            with open(path, "wb") as f:
+                f.write(skin_renderer.encode_png(render))
+
+    async def __render_skin(self, skin_file, skin_url, etags):
+        headers = {}
+        if os.path.exists(skin_file) and skin_url in etags:
+            headers["If-None-Match"] = etags[skin_url]
+        try:
+            resp = await self.skin_session.get(skin_url, headers=headers)
+        except httpx.HTTPError:
+            return False
+        if resp.status_code == 304:
+            os.utime(skin_file)
+            return True
+        if resp.status_code != 200:
+            return False
+        with open(skin_file, "wb") as f:
+            f.write(resp.content)
+        if resp.headers.get("ETag"):
+            etags[skin_url] = resp.headers["ETag"]
+        return True
+
+    @staticmethod
+    def _load_skin_etags():
+        if os.path.exists(SKINS_ETAGS_FILE):
+            try:
+                with open(SKINS_ETAGS_FILE, "r") as f:
+                    return json.load(f)
+            except json.JSONDecodeError:
+                pass
+        return {}
+
+    @staticmethod
+    def _save_skin_etags(etags):
+        with open(SKINS_ETAGS_FILE, "w") as f:
+            json.dump(etags, f)
+
+    @staticmethod
+    def _evict_skin_cache(keep):
+        keep = {os.path.abspath(f) for f in keep}
+        folders = [SKINS_CACHE_FOLDER]
+        if SKINS_TEXTURES_FOLDER.exists():
+            folders.append(SKINS_TEXTURES_FOLDER)
+        renders = sorted(
+            (
+                entry
+                for folder in folders
+                for entry in os.scandir(folder)
+                if entry.is_file() and entry.name != SKINS_ETAGS_FILE.name
+            ),
+            key=lambda entry: entry.stat().st_mtime,
+        )
+        total_size = sum(entry.stat().st_size for entry in renders)
+        for entry in renders:
+            if total_size <= SKINS_CACHE_MAX_SIZE:
+                break
+            if os.path.abspath(entry.path) in keep:
+                continue
+            total_size -= entry.stat().st_size
+            os.remove(entry.path)
 
     @property
     def username(self):
@@ -4,20 +4,22 @@ import hashlib
 import logging
 from zipfile import ZipFile
 
+from github_api import github_api
 from minecraft_launcher_lib._helper import empty
 
 # GITHUB = https://github.com/yushijinhun/authlib-injector/releases
 
 class Authlib:
     def __init__(self):
-        self.base_url = "https://api.github.com/repos/yushijinhun/authlib-injector/releases"
+        self.base_url = "/repos/yushijinhun/authlib-injector/releases"
         self.releases = self.get_releases()
     
     def get_releases(self):
-        response = httpx.get(self.base_url)
-        if response.status_code != 200:
+        try:
+            # Releases are rare, the cached list is good for an hour
+            self.releases = github_api.get(self.base_url, max_age=3600)
+        except httpx.HTTPError:
             return "Помилка сервера або відсутній інтернет"
-        self.releases = response.json()
         return self.releases
 
     def download_latest_release(self, path, callback: dict) -> bool:
@@ -0,0 +1,78 @@
+import hashlib
+import logging
+import re
+from pathlib import Path
+
+
+class ClassDataSharing:
+    """
+    Manages a dynamic AppCDS archive for every modpack version.
+    The first launch dumps the loaded classes at exit, later launches map them
+    from the archive instead of loading and verifying them again.
+    """
+
+    # Dynamic archives are supported since Java 13
+    MIN_JAVA_VERSION = 13
+
+    def get_jvm_arguments(
+        self, command: list[str], archive_dir: Path, name: str
+    ) -> list[str]:
+        """Return the CDS flags for a launch command built by get_minecraft_command."""
+        java_version = self._get_java_version(command[0])
+        if java_version is None or self._major(java_version) < self.MIN_JAVA_VERSION:
+            return []
+
+        archive_dir.mkdir(parents=True, exist_ok=True)
+        archive_file = archive_dir / f"{name}.jsa"
+        key_file = archive_dir / f"{name}.key"
+        key = self._get_key(command, java_version, archive_dir.parent)
+
+        if (
+            archive_file.exists()
+            and key_file.exists()
+            and key_file.read_text().strip() == key
+        ):
+            return [f"-XX:SharedArchiveFile={archive_file}"]
+
+        # Classpath, mods or runtime changed: dump a new archive at exit
+        logging.info(f"Creating CDS archive {archive_file}")
+        archive_file.unlink(missing_ok=True)
+        key_file.write_text(key)
+        return [f"-XX:ArchiveClassesAtExit={archive_file}"]
+
+    def _get_key(self, command: list[str], java_version: str, game_dir: Path) -> str:
+        key = hashlib.sha1()
+        key.update(java_version.encode())
+        key.update(command[0].encode())
+        # the runtime .version identifies the vendor build
+        version_file = Path(command[0]).resolve().parent.parent / ".version"
+        if version_file.exists():
+            key.update(version_file.read_bytes())
+        if "-cp" in command:
+            key.update(command[command.index("-cp") + 1].encode())
+        # Mods are loaded by the modloader, not from the classpath
+        mods_dir = game_dir / "mods"
+        if mods_dir.exists():
+            for mod in sorted(mods_dir.glob("*.jar")):
+                key.update(f"{mod.name}:{mod.stat().st_size}".encode())
+        return key.hexdigest()
+
+    def _get_java_version(self, java_exec: str) -> str | None:
+        # <java home>/bin/java -> <java home>/release
+        release_file = Path(java_exec).resolve().parent.parent / "release"
+        try:
+            with open(release_file, "r") as f:
+                match = re.search(r'^JAVA_VERSION="(.+)"', f.read(), re.MULTILINE)
+        except OSError:
+            return None
+        return match.group(1) if match else None
+
+    @staticmethod
+    def _major(version: str) -> int:
+        parts = version.split(".")
+        if parts[0] == "1" and len(parts) > 1:
+            return int(parts[1])
+        return int(re.match(r"\d+", parts[0]).group())
+
+
+cds = ClassDataSharing()
@@ -0,0 +1,111 @@
+import hashlib
+import re
+import struct
+import zlib
+
+# Delta patch format, published as "<executable>-<from version>.delta":
+#   magic, sha256 of the old executable, sha256 of the new one,
+#   then a zlib stream of operations:
+#     0x00 <offset: u64> <length: u64>  copy bytes from the old executable
+#     0x01 <length: u64> <data>         insert new bytes
+DELTA_MAGIC = b"CDVDELTA1"
+HEADER_SIZE = len(DELTA_MAGIC) + 64
+# Chunks end after one of these byte pairs, about every 8 KiB in compressed
+# data. Boundaries depend on the content only, so the chunks of both files
+# line up again after an insertion
+CHUNK_BOUNDARY = re.compile(rb"[\x80-\x87]\xa5")
+# A copy operation takes 17 bytes, shorter chunks aren't worth one
+MIN_CHUNK_SIZE = 256
+READ_CHUNK_SIZE = 1024 * 1024
+
+
+def _chunks(data: bytes):
+    start = 0
+    for match in CHUNK_BOUNDARY.finditer(data):
+        if match.end() - start >= MIN_CHUNK_SIZE:
+            yield start, match.end()
+            start = match.end()
+    if start < len(data):
+        yield start, len(data)
+
+
+def make_delta(old: bytes, new: bytes) -> bytes:
+    """Delta patch that builds new from old."""
+    offsets: dict[bytes, int] = {}
+    for start, end in _chunks(old):
+        offsets.setdefault(old[start:end], start)
+
+    # [offset, length] copies and bytearray inserts, neighbours are merged
+    operations: list[list[int] | bytearray] = []
+    for start, end in _chunks(new):
+        chunk = new[start:end]
+        offset = offsets.get(chunk)
+        last = operations[-1] if operations else None
+        if offset is None:
+            if isinstance(last, bytearray):
+                last += chunk
+            else:
+                operations.append(bytearray(chunk))
+        elif isinstance(last, list) and last[0] + last[1] == offset:
+            last[1] += len(chunk)
+        else:
+            operations.append([offset, len(chunk)])
+
+    encoded = bytearray()
+    for operation in operations:
+        if isinstance(operation, list):
+            encoded += b"\x00" + struct.pack(">QQ", *operation)
+        else:
+            encoded += b"\x01" + struct.pack(">Q", len(operation)) + operation
+    return (
+        DELTA_MAGIC
+        + hashlib.sha256(old).digest()
+        + hashlib.sha256(new).digest()
+        + zlib.compress(bytes(encoded), 9)
+    )
+
+
+def apply_delta(delta: bytes, old_path: str, new_path: str) -> str:
+    """
+    Write the file delta builds from old_path to new_path and return its
+    sha256 hex digest. Raises ValueError when delta was made for another
+    file or the result doesn't match, zlib.error or struct.error when it is
+    corrupt.
+    """
+    if delta[: len(DELTA_MAGIC)] != DELTA_MAGIC:
+        raise ValueError("Not a delta patch")
+    old_hash = delta[len(DELTA_MAGIC) : len(DELTA_MAGIC) + 32]
+    new_hash = delta[len(DELTA_MAGIC) + 32 : HEADER_SIZE]
+    if _sha256_file(old_path) != old_hash:
+        raise ValueError("Delta was made for a different file")
+    operations = zlib.decompress(delta[HEADER_SIZE:])
+
+    sha256 = hashlib.sha256()
+    position = 0
+    with open(old_path, "rb") as old, open(new_path, "wb") as new:
+        while position < len(operations):
+            operation = operations[position]
+            if operation == 0:
+                offset, length = struct.unpack_from(">QQ", operations, position + 1)
+                position += 17
+                old.seek(offset)
+                data = old.read(length)
+            elif operation == 1:
+                (length,) = struct.unpack_from(">Q", operations, position + 1)
+                data = operations[position + 9 : position + 9 + length]
+                position += 9 + length
+            else:
+                raise ValueError(f"Unknown delta operation {operation}")
+            sha256.update(data)
+            new.write(data)
+    if sha256.digest() != new_hash:
+        raise ValueError("Patched file doesn't match the delta")
+    return sha256.hexdigest()
+
+
+def _sha256_file(path: str) -> bytes:
+    sha256 = hashlib.sha256()
+    with open(path, "rb") as f:
+        while chunk := f.read(READ_CHUNK_SIZE):
+            sha256.update(chunk)
+    return sha256.digest()
@@ -0,0 +1,181 @@
+import errno
+import json
+import logging
+import os
+import shutil
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from config import APPDATA_FOLDER
+from settings import settings
+from trash import TRASH_FOLDER_NAME, trash
+
+# Unfinished relocation, resumed on the next start
+RELOCATION_FILE = APPDATA_FOLDER / "relocation.json"
+COPY_WORKERS = 8
+# FAT32 stores modification times in 2 second steps
+MTIME_TOLERANCE = 2
+
+
+def empty(*args, **kwargs):
+    pass
+
+
+class DirectoryRelocation:
+    """
+    Moves the Minecraft directory in the background. Entries are renamed
+    when both folders are on the same filesystem, otherwise files are
+    copied in parallel, verified, and only then removed from the source.
+    A copy that was interrupted resumes by skipping files already copied.
+    """
+
+    def __init__(self):
+        self.active = False
+        self._lock = threading.Lock()
+
+    def pending(self) -> tuple[str, str] | None:
+        if not RELOCATION_FILE.exists():
+            return None
+        try:
+            with open(RELOCATION_FILE, "r") as f:
+                data = json.load(f)
+            return data["source"], data["destination"]
+        except (json.JSONDecodeError, KeyError, OSError):
+            return None
+
+    def relocate(
+        self, source: str, destination: str, callback: dict | None = None
+    ) -> None:
+        """Blocking, run it in a thread."""
+        callback = callback or {}
+        if _is_inside(destination, source):
+            # also drops a pending relocation that could never finish
+            RELOCATION_FILE.unlink(missing_ok=True)
+            raise ValueError("Нова тека не може бути всередині теки Minecraft")
+        with self._lock:
+            if self.active:
+                raise RuntimeError("Relocation is already running")
+            self.active = True
+        try:
+            os.makedirs(destination, exist_ok=True)
+            with open(RELOCATION_FILE, "w") as f:
+                json.dump({"source": source, "destination": destination}, f)
+            if not os.path.exists(source):
+                # source already cleaned up by an interrupted run
+                pass
+            elif not self._rename(source, destination):
+                self._copy(source, destination, callback)
+            settings.minecraft_directory = destination
+            settings.save()
+            settings.flush()
+            if os.path.exists(source) and any(os.scandir(source)):
+                callback.get("setStatus", empty)("Видалення старої теки...")
+                for entry in os.scandir(source):
+                    # emptied by the trash worker
+                    if entry.name == TRASH_FOLDER_NAME:
+                        continue
+                    _remove(entry.path)
+                trash.resume(source)
+            RELOCATION_FILE.unlink()
+            logging.info(f"Minecraft directory moved to {destination}")
+        finally:
+            self.active = False
+
+    @staticmethod
+    def _rename(source: str, destination: str) -> bool:
+        """Rename every entry, False when the folders are on different devices."""
+        if os.stat(source).st_dev != os.stat(destination).st_dev:
+            return False
+        for entry in os.scandir(source):
+            if entry.name == TRASH_FOLDER_NAME:
+                continue
+            target = os.path.join(destination, entry.name)
+            if os.path.lexists(target):
+                _remove(target)
+            try:
+                os.rename(entry.path, target)
+            except OSError as e:
+                if e.errno == errno.EXDEV:
+                    return False
+                raise
+        return True
+
+    @staticmethod
+    def _copy(source: str, destination: str, callback: dict) -> None:
+        files = []
+        for root, dirs, filenames in os.walk(source):
+            relative_root = os.path.relpath(root, source)
+            if relative_root == ".":
+                # pending deletions stay behind
+                dirs[:] = [name for name in dirs if name != TRASH_FOLDER_NAME]
+            for name in dirs:
+                path = os.path.join(root, name)
+                if os.path.islink(path):
+                    filenames.append(name)
+                else:
+                    os.makedirs(
+                        os.path.join(destination, relative_root, name), exist_ok=True
+                    )
+            for name in filenames:
+                path = os.path.join(root, name)
+                files.append((path, os.path.join(destination, relative_root, name)))
+
+        # Files left by an interrupted copy are kept when they match
+        to_copy = [(src, dst) for src, dst in files if not _is_copied(src, dst)]
+        total = sum(os.lstat(src).st_size for src, _ in to_copy)
+        copied = 0
+        progress_lock = threading.Lock()
+        callback.get("setStatus", empty)("Копіювання теки Minecraft...")
+        callback.get("setMax", empty)(total)
+        callback.get("setProgress", empty)(0)
+
+        def copy_file(src: str, dst: str) -> None:
+            nonlocal copied
+            part = f"{dst}.part"
+            if os.path.lexists(part):
+                os.unlink(part)
+            shutil.copy2(src, part, follow_symlinks=False)
+            if os.path.isdir(dst) and not os.path.islink(dst):
+                shutil.rmtree(dst)
+            os.replace(part, dst)
+            with progress_lock:
+                copied += os.lstat(src).st_size
+                callback.get("setProgress", empty)(copied)
+
+        with ThreadPoolExecutor(max_workers=COPY_WORKERS) as executor:
+            for future in [executor.submit(copy_file, *pair) for pair in to_copy]:
+                future.result()
+
+        callback.get("setStatus", empty)("Перевірка файлів...")
+        for src, dst in files:
+            if not _is_copied(src, dst):
+                raise OSError(f"File was not copied correctly: {dst}")
+
+
+def _is_copied(src: str, dst: str) -> bool:
+    if not os.path.lexists(dst):
+        return False
+    src_stat, dst_stat = os.lstat(src), os.lstat(dst)
+    return (
+        src_stat.st_size == dst_stat.st_size
+        and abs(src_stat.st_mtime - dst_stat.st_mtime) <= MTIME_TOLERANCE
+    )
+
+
+def _is_inside(path: str, directory: str) -> bool:
+    path, directory = os.path.realpath(path), os.path.realpath(directory)
+    try:
+        return os.path.commonpath([path, directory]) == directory
+    except ValueError:
+        # different drives (Windows)
+        return False
+
+
+def _remove(path: str) -> None:
+    if os.path.isdir(path) and not os.path.islink(path):
+        shutil.rmtree(path)
+    else:
+        os.unlink(path)
+
+
+dir_relocation = DirectoryRelocation()
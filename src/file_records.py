@@ -0,0 +1,70 @@
+import json
+import logging
+import os
+import threading
+
+from config import APPDATA_FOLDER
+
+
+class FileRecords:
+    """
+    Hashes of the installed files of a modpack, by path relative to the
+    modpack folder. A record is only trusted while the size and mtime of the
+    file match, so files changed by the player are hashed again.
+    """
+
+    def __init__(self):
+        self._records_dir = APPDATA_FOLDER / "file_records"
+        self._records_dir.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+
+    def load(self, name: str) -> dict:
+        path = self._records_dir / f"{name}.json"
+        if not path.exists():
+            return {}
+        try:
+            with open(path, "r") as f:
+                return json.load(f)
+        except (json.JSONDecodeError, OSError):
+            return {}
+
+    def save(self, name: str, records: dict) -> None:
+        try:
+            with open(self._records_dir / f"{name}.json", "w") as f:
+                json.dump(records, f)
+        except OSError as e:
+            logging.info(f"Failed to save file records of {name}: {e}")
+
+    def get(self, records: dict, file_name: str, full_path: str, key: str):
+        """Recorded hash, None when the file is missing or changed since."""
+        try:
+            stat = os.stat(full_path)
+        except FileNotFoundError:
+            return None
+        with self._lock:
+            record = records.get(file_name)
+        if (
+            record
+            and record["size"] == stat.st_size
+            and record["mtime"] == stat.st_mtime_ns
+        ):
+            return record.get(key)
+        return None
+
+    def set(self, records: dict, file_name: str, full_path: str, **hashes) -> None:
+        """Record hashes of a file, hashes of the previous content are dropped."""
+        stat = os.stat(full_path)
+        record = {"size": stat.st_size, "mtime": stat.st_mtime_ns}
+        with self._lock:
+            previous = records.get(file_name)
+            if (
+                previous
+                and previous["size"] == stat.st_size
+                and previous["mtime"] == stat.st_mtime_ns
+            ):
+                record = previous
+            record.update(hashes)
+            records[file_name] = record
+
+
+file_records = FileRecords()
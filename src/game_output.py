@@ -0,0 +1,77 @@
+import asyncio
+import gzip
+import logging
+from collections import deque
+from datetime import datetime
+from typing import Callable
+
+from config import APPDATA_FOLDER
+
+GAME_LOGS_FOLDER = APPDATA_FOLDER / "logs"
+# Lines kept in memory for the crash dialog
+RING_BUFFER_SIZE = 500
+# Compressed session logs kept on disk
+LOG_FILES_KEPT = 10
+# Stream limit of the game pipes, longer lines are split into parts
+MAX_LINE_LENGTH = 1024 * 1024
+
+
+class GameOutput:
+    """
+    Streams stdout and stderr of the game without blocking the event loop.
+    The last lines are kept in fixed-size ring buffers, the full output
+    goes to a gzip compressed log file that is rotated per session.
+    """
+
+    def __init__(self, name: str):
+        self.lines: deque[str] = deque(maxlen=RING_BUFFER_SIZE)
+        self.stderr: deque[str] = deque(maxlen=RING_BUFFER_SIZE)
+        self._listeners: list[Callable[[str], None]] = []
+        GAME_LOGS_FOLDER.mkdir(parents=True, exist_ok=True)
+        self._rotate(name)
+        timestamp = datetime.now().strftime("%Y%m%d-%H%M%S")
+        self.log_file = GAME_LOGS_FOLDER / f"{name}-{timestamp}.log.gz"
+
+    def add_listener(self, listener: Callable[[str], None]) -> None:
+        """Call listener with every line of output as it arrives."""
+        self._listeners.append(listener)
+
+    async def consume(self, process: asyncio.subprocess.Process) -> None:
+        """Read both pipes until the game closes them."""
+        with gzip.open(self.log_file, "wt", encoding="utf-8") as log:
+            await asyncio.gather(
+                self._read(process.stdout, log, is_stderr=False),
+                self._read(process.stderr, log, is_stderr=True),
+            )
+
+    async def _read(self, stream: asyncio.StreamReader, log, is_stderr: bool) -> None:
+        while True:
+            try:
+                data = await stream.readuntil(b"\n")
+            except asyncio.IncompleteReadError as e:
+                # Last line without a newline
+                data = e.partial
+            except asyncio.LimitOverrunError as e:
+                # Line is longer than the stream limit, take the part read so far
+                data = await stream.readexactly(e.consumed)
+            if not data:
+                return
+            line = data.decode("utf-8", errors="replace")
+            log.write(line)
+            self.lines.append(line)
+            if is_stderr:
+                self.stderr.append(line)
+            for listener in self._listeners:
+                try:
+                    listener(line)
+                except Exception as e:
+                    logging.error(f"Game output listener failed: {e}")
+
+    @staticmethod
+    def _rotate(name: str) -> None:
+        logs = sorted(GAME_LOGS_FOLDER.glob(f"{name}-????????-??????.log.gz"))
+        for old_log in logs[: max(0, len(logs) - LOG_FILES_KEPT + 1)]:
+            try:
+                old_log.unlink()
+            except OSError as e:
+                logging.info(f"Failed to remove old game log {old_log}: {e}")
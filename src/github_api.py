@@ -0,0 +1,164 @@
+import json
+import logging
+import threading
+import time
+from typing import Any
+from urllib.parse import urlencode
+
+import httpx
+
+from config import APPDATA_FOLDER
+
+GITHUB_API_URL = "https://api.github.com"
+CACHE_FILE = APPDATA_FOLDER / "github_cache.json"
+# Below this many remaining requests cached responses are served even when
+# stale, so the requests left go to things that were never fetched
+LOW_BUDGET = 10
+
+
+class RateLimitExceeded(httpx.HTTPError):
+    def __init__(self, reset_at: float):
+        super().__init__(f"GitHub API rate limit exceeded until {time.ctime(reset_at)}")
+        self.reset_at = reset_at
+
+
+class InvalidResponse(httpx.HTTPError):
+    pass
+
+
+class GitHubAPI:
+    """
+    Client for the unauthenticated GitHub API shared by the whole launcher,
+    which gets 60 requests per hour per IP address. The remaining budget is
+    tracked from the response headers of every caller, requests are
+    conditional on the ETag of the cached response, and responses are kept
+    on disk, so cached data is served when the budget is spent or GitHub is
+    unreachable.
+    """
+
+    def __init__(self):
+        self._client = httpx.Client(
+            base_url=GITHUB_API_URL,
+            headers={"Accept": "application/vnd.github+json"},
+            follow_redirects=True,
+            timeout=30,
+        )
+        self._lock = threading.Lock()
+        # url -> {"data": ..., "etag": ..., "fetched_at": ...}
+        self._cache: dict[str, dict] = {}
+        self.remaining: int | None = None
+        self.reset_at = 0.0
+        self._load_cache()
+
+    def _load_cache(self) -> None:
+        if not CACHE_FILE.exists():
+            return
+        try:
+            with open(CACHE_FILE, "r") as f:
+                data = json.load(f)
+            self._cache = data.get("responses", {})
+            # the budget is per IP address, it carries over a restart
+            if data.get("reset_at", 0) > time.time():
+                self.remaining = data.get("remaining")
+                self.reset_at = data["reset_at"]
+        except (json.JSONDecodeError, OSError, KeyError) as e:
+            logging.info(f"Failed to load GitHub cache: {e}")
+
+    def _save_cache(self) -> None:
+        with self._lock:
+            data = {
+                "responses": self._cache,
+                "remaining": self.remaining,
+                "reset_at": self.reset_at,
+            }
+            try:
+                with open(CACHE_FILE, "w") as f:
+                    json.dump(data, f)
+            except OSError as e:
+                logging.info(f"Failed to save GitHub cache: {e}")
+
+    def get(
+        self,
+        url: str,
+        max_age: float = 0,
+        params: dict | None = None,
+        cache: bool = True,
+        allow_stale: bool = True,
+    ) -> Any:
+        """
+        JSON response of url, relative to the API or absolute. A cached
+        response younger than max_age seconds is returned without a request.
+        Raises httpx.HTTPError, InvalidResponse when the response isn't JSON,
+        or RateLimitExceeded when the budget is spent and nothing is cached.
+        With allow_stale off, a cached response is only used after GitHub
+        confirmed it is current.
+        """
+        key = f"{url}?{urlencode(params)}" if params else url
+        with self._lock:
+            cached = self._cache.get(key)
+        if cached and time.time() - cached["fetched_at"] < max_age:
+            return cached["data"]
+        if self._budget_spent(LOW_BUDGET if cached and allow_stale else 0):
+            if cached and allow_stale:
+                logging.info(f"GitHub API budget is low, serving cached {key}")
+                return cached["data"]
+            raise RateLimitExceeded(self.reset_at)
+
+        headers = {}
+        if cached and cached.get("etag"):
+            headers["If-None-Match"] = cached["etag"]
+        try:
+            response = self._client.get(url, params=params, headers=headers)
+            self._update_budget(response)
+            if response.status_code == 304:
+                cached["fetched_at"] = time.time()
+                self._save_cache()
+                return cached["data"]
+            if response.status_code in (403, 429) and self.remaining == 0:
+                raise RateLimitExceeded(self.reset_at)
+            response.raise_for_status()
+            data = response.json()
+        except (httpx.HTTPError, ValueError) as e:
+            # keep the budget learned from a failed response
+            self._save_cache()
+            if cached and allow_stale:
+                logging.info(f"GitHub API request failed, serving cached {key}: {e}")
+                return cached["data"]
+            if isinstance(e, ValueError):
+                # e.g. the login page of a captive portal
+                raise InvalidResponse(f"GitHub API sent no JSON for {key}: {e}") from e
+            raise
+
+        if cache:
+            with self._lock:
+                self._cache[key] = {
+                    "data": data,
+                    "etag": response.headers.get("ETag"),
+                    "fetched_at": time.time(),
+                }
+        self._save_cache()
+        return data
+
+    def _budget_spent(self, reserve: int) -> bool:
+        if self.remaining is None or time.time() >= self.reset_at:
+            return False
+        return self.remaining <= reserve
+
+    def _update_budget(self, response: httpx.Response) -> None:
+        remaining = response.headers.get("X-RateLimit-Remaining")
+        reset = response.headers.get("X-RateLimit-Reset")
+        if remaining is None or reset is None:
+            return
+        try:
+            self.remaining = int(remaining)
+            self.reset_at = float(reset)
+        except ValueError:
+            return
+        if self.remaining <= LOW_BUDGET:
+            logging.info(
+                f"GitHub API budget: {self.remaining} requests until "
+                f"{time.ctime(self.reset_at)}"
+            )
+
+
+github_api = GitHubAPI()
@@ -0,0 +1,188 @@
+import json
+import logging
+import re
+import statistics
+from pathlib import Path
+
+from config import APPDATA_FOLDER, JVM_ARGS, RAM_SIZE, RAM_STEP
+from settings import settings
+
+# [12.345s][info][gc] GC(3) Pause Young (Normal) (G1 Evacuation Pause) 512M->128M(1024M) 5.123ms
+_UPTIME_RE = re.compile(r"^\[(\d+\.\d+)s\]")
+_PAUSE_RE = re.compile(r"GC\(\d+\) Pause (.+?) (\d+\.\d+)ms$")
+_HEAP_RE = re.compile(r"(\d+)M->(\d+)M\((\d+)M\)")
+
+GC_ARGS = {
+    "shenandoah": JVM_ARGS,
+    "g1": [
+        "-XX:+UseG1GC",
+        "-XX:MaxGCPauseMillis=50",
+        "-XX:G1HeapRegionSize=16M",
+    ],
+}
+
+# Sessions that are kept for recommendations
+HISTORY_SIZE = 5
+# Memory that is left to the OS and the JVM itself (MB)
+MIN_SYSTEM_RESERVE = 2048
+MIN_HEAP = 2048
+
+
+class JvmTuner:
+    """
+    Records GC logs of game sessions and derives heap size and GC choice from them.
+    Only active when settings.game.auto_tune is enabled.
+    """
+
+    def __init__(self):
+        self._tuning_dir = APPDATA_FOLDER / "jvm_tuning"
+        self._tuning_dir.mkdir(parents=True, exist_ok=True)
+
+    def get_jvm_arguments(self, modpack_name: str, jvm_args: list[str]) -> list[str]:
+        """Apply the recommendation and enable GC logging for the next launch."""
+        if not settings.game.auto_tune:
+            return jvm_args
+        recommendation = self.get_recommendation(modpack_name)
+        if recommendation:
+            jvm_args = self._apply(jvm_args, recommendation)
+        log_file = self._gc_log_file(modpack_name)
+        log_file.unlink(missing_ok=True)
+        # Quoted, because Windows paths contain a colon
+        return jvm_args + [f'-Xlog:gc:file="{log_file}":uptime,level,tags']
+
+    def analyze_session(self, modpack_name: str) -> dict | None:
+        """Parse the GC log of the last session and update the recommendation."""
+        if not settings.game.auto_tune:
+            return None
+        log_file = self._gc_log_file(modpack_name)
+        if not log_file.exists():
+            return None
+        session = self.parse_gc_log(log_file)
+        if session is None:
+            return None
+
+        data = self._load(modpack_name)
+        data["sessions"] = (data.get("sessions", []) + [session])[-HISTORY_SIZE:]
+        data["recommendation"] = self.recommend(data["sessions"])
+        self._save(modpack_name, data)
+        logging.info(f"JVM tuning for {modpack_name}: {session} -> {data['recommendation']}")
+        return data["recommendation"]
+
+    def get_recommendation(self, modpack_name: str) -> dict | None:
+        return self._load(modpack_name).get("recommendation")
+
+    @staticmethod
+    def parse_gc_log(log_file: Path) -> dict | None:
+        """Collect pause times, heap occupancy and allocation rate from a unified GC log."""
+        pauses = []
+        full_pauses = 0
+        live_sizes = []
+        allocated = 0
+        last_after = None
+        committed = 0
+        uptime = 0.0
+        with open(log_file, "r", errors="replace") as f:
+            for line in f:
+                line = line.rstrip()
+                uptime_match = _UPTIME_RE.match(line)
+                if uptime_match:
+                    uptime = float(uptime_match.group(1))
+                pause = _PAUSE_RE.search(line)
+                if pause:
+                    pauses.append(float(pause.group(2)))
+                    if "Full" in pause.group(1) or "Degenerated" in pause.group(1):
+                        full_pauses += 1
+                heap = _HEAP_RE.search(line)
+                if heap:
+                    before, after, committed = map(int, heap.groups())
+                    live_sizes.append(after)
+                    if last_after is not None and before > last_after:
+                        allocated += before - last_after
+                    last_after = after
+        if not live_sizes or uptime <= 0:
+            return None
+        pauses.sort()
+        return {
+            "duration": round(uptime),
+            "pause_count": len(pauses),
+            "pause_max": pauses[-1] if pauses else 0.0,
+            "pause_p95": pauses[int(len(pauses) * 0.95)] if pauses else 0.0,
+            "full_pauses": full_pauses,
+            "live_max": max(live_sizes),
+            "live_avg": round(statistics.mean(live_sizes)),
+            "committed": committed,
+            "allocation_rate": round(allocated / uptime, 1),
+        }
+
+    @staticmethod
+    def recommend(sessions: list[dict]) -> dict:
+        """Heap size and GC for the next launch, capped by the installed RAM."""
+        live_max = max(s["live_max"] for s in sessions)
+        pause_p95 = max(s["pause_p95"] for s in sessions)
+        full_pauses = sum(s["full_pauses"] for s in sessions)
+        committed = max(s["committed"] for s in sessions)
+
+        # Keep the live set at about a third of the heap
+        heap = live_max * 3
+        if full_pauses:
+            heap = max(heap, int(committed * 1.25))
+        reserve = max(MIN_SYSTEM_RESERVE, RAM_SIZE // 4)
+        max_heap = max(MIN_HEAP, RAM_SIZE - reserve)
+        capped = heap > max_heap
+        heap = min(max(heap, MIN_HEAP), max_heap)
+        heap = (heap + RAM_STEP - 1) // RAM_STEP * RAM_STEP
+
+        # Shenandoah needs headroom, G1 copes better with a tight heap
+        gc = "g1" if capped and full_pauses else "shenandoah"
+        if gc == "g1" and pause_p95 > 200:
+            gc = "shenandoah"
+
+        return {
+            "max_use_ram": heap,
+            "min_use_ram": min(heap, max(MIN_HEAP, live_max * 2 // RAM_STEP * RAM_STEP)),
+            "gc": gc,
+        }
+
+    @staticmethod
+    def _apply(jvm_args: list[str], recommendation: dict) -> list[str]:
+        gc_flags = [
+            arg
+            for args in GC_ARGS.values()
+            for arg in args
+            if arg != "-XX:+UnlockExperimentalVMOptions"
+        ]
+        args = [
+            arg
+            for arg in jvm_args
+            if not arg.startswith(("-Xmx", "-Xms"))
+            and arg not in gc_flags
+            and not re.match(r"-XX:\+Use\w+GC$", arg)
+        ]
+        args += [
+            f"-Xmx{recommendation['max_use_ram']}M",
+            f"-Xms{recommendation['min_use_ram']}M",
+        ]
+        for arg in GC_ARGS[recommendation["gc"]]:
+            if arg not in args:
+                args.append(arg)
+        return args
+
+    def _gc_log_file(self, modpack_name: str) -> Path:
+        return self._tuning_dir / f"{modpack_name}-gc.log"
+
+    def _load(self, modpack_name: str) -> dict:
+        path = self._tuning_dir / f"{modpack_name}.json"
+        if not path.exists():
+            return {}
+        try:
+            with open(path, "r") as f:
+                return json.load(f)
+        except json.JSONDecodeError:
+            return {}
+
+    def _save(self, modpack_name: str, data: dict) -> None:
+        with open(self._tuning_dir / f"{modpack_name}.json", "w") as f:
+            json.dump(data, f)
+
+
+jvm_tuner = JvmTuner()
@@ -0,0 +1,96 @@
+import json
+import logging
+import re
+import statistics
+import time
+from datetime import datetime
+
+from config import APPDATA_FOLDER
+
+# Markers in the game output, in the order they appear during start-up
+LAUNCH_PHASES = {
+    "mods_discovered": re.compile(r"Loading \d+ mods|ModLauncher running"),
+    "game_started": re.compile(r"Setting user: "),
+    "window_created": re.compile(r"Backend library: LWJGL"),
+    "resources_loading": re.compile(r"Reloading ResourceManager"),
+    "main_menu": re.compile(r"Sound engine started"),
+}
+# Launches kept per modpack
+HISTORY_SIZE = 50
+
+
+class LaunchTimer:
+    """Timestamps the phases of one game launch, relative to the Play click."""
+
+    def __init__(self, modpack_name: str, modpack_version: str):
+        self.modpack_name = modpack_name
+        self.modpack_version = modpack_version
+        self.phases: dict[str, float] = {}
+        self._start = time.monotonic()
+
+    def mark(self, phase: str) -> None:
+        if phase not in self.phases:
+            self.phases[phase] = round(time.monotonic() - self._start, 2)
+
+    def on_line(self, line: str) -> None:
+        """Listener for the game output."""
+        self.mark("jvm_started")
+        for phase, marker in LAUNCH_PHASES.items():
+            if phase not in self.phases and marker.search(line):
+                self.mark(phase)
+
+    @property
+    def main_menu_reached(self) -> bool:
+        return "main_menu" in self.phases
+
+    def to_dict(self) -> dict:
+        return {
+            "time": datetime.now().isoformat(timespec="seconds"),
+            "version": self.modpack_version,
+            "phases": self.phases,
+        }
+
+
+class LaunchHistory:
+    """Per-modpack history of launch timings."""
+
+    def __init__(self):
+        self._history_dir = APPDATA_FOLDER / "launch_history"
+        self._history_dir.mkdir(parents=True, exist_ok=True)
+
+    def load(self, modpack_name: str) -> list[dict]:
+        path = self._history_dir / f"{modpack_name}.json"
+        if not path.exists():
+            return []
+        try:
+            with open(path, "r") as f:
+                return json.load(f)
+        except json.JSONDecodeError:
+            return []
+
+    def add(self, timer: LaunchTimer) -> None:
+        records = self.load(timer.modpack_name) + [timer.to_dict()]
+        with open(self._history_dir / f"{timer.modpack_name}.json", "w") as f:
+            json.dump(records[-HISTORY_SIZE:], f)
+        logging.info(f"Launch timings for {timer.modpack_name}: {timer.phases}")
+
+    def compare_to_previous_version(self, modpack_name: str) -> float | None:
+        """
+        Difference in seconds between the median time to main menu of the
+        current modpack version and the version before it.
+        """
+        records = [r for r in self.load(modpack_name) if "main_menu" in r["phases"]]
+        if not records:
+            return None
+        current_version = records[-1]["version"]
+        current = [r["phases"]["main_menu"] for r in records if r["version"] == current_version]
+        previous_versions = [r["version"] for r in records if r["version"] != current_version]
+        if not previous_versions:
+            return None
+        previous = [
+            r["phases"]["main_menu"] for r in records if r["version"] == previous_versions[-1]
+        ]
+        return statistics.median(current) - statistics.median(previous)
+
+
+launch_history = LaunchHistory()
@@ -1,9 +1,13 @@
+import asyncio
+
 import flet as ft
+import minecraft_launcher_lib as mcl
 
 from routes import LoginPage, MainPage, ProfilePage, RegisterPage, SettingsPage
 from settings import settings
 from utils import setup_theme_settings
 from config import (
+    APPDATA_FOLDER,
     LAUNCHER_NAME,
     LAUNCHER_VERSION,
     WINDOW_SIZE,
@@ -50,11 +54,20 @@ async def main(page: ft.Page):
     page.on_route_change = route_change
     from auth import account
 
-    if await account.avalidate() and await account.aget_user():
+    # validation and the user fetch don't depend on each other
+    valid, user_fetched = await asyncio.gather(account.validate(), account.get_user())
+    if not valid and account.access_token:
+        valid = not isinstance(await account.refresh(), str)
+    page.run_task(account.keep_token_fresh)
+    if valid and user_fetched:
         page.go("/")
     else:
         page.go("/login")
 
 
 if __name__ == "__main__":
+    # Share one java runtime between all modpacks, outside the Minecraft
+    # directory so it stays the same when that directory is changed
+    mcl.runtime.set_shared_runtime_directory(APPDATA_FOLDER / "runtime")
+    mcl.runtime.set_use_system_java(settings.game.use_system_java)
     ft.app(target=main, view=ft.AppView.FLET_APP_HIDDEN)
@@ -3,6 +3,7 @@
 # SPDX-License-Identifier: BSD-2-Clause
 """This module contains some helper functions. It should not be used outside minecraft_launcher_lib"""
 
+import concurrent.futures
 import datetime
 import hashlib
 import json
@@ -10,6 +11,7 @@ import lzma
 import os
 import platform
 import re
+import shutil
 import subprocess
 import sys
 
@@ -287,11 +289,77 @@ def extract_file_from_zip(
     minecraft_directory: Optional[str | os.PathLike] = None,
 ) -> None:
     """Extract a file from a zip handler into the given path."""
-    if minecraft_directory is not None:
-        check_path_inside_minecraft_directory(minecraft_directory, extract_path)
-    os.makedirs(os.path.dirname(extract_path), exist_ok=True)
-    with handler.open(zip_path, "r") as f, open(extract_path, "wb") as w:
-        w.write(f.read())
+    extract_zip_members(handler, [(zip_path, extract_path)], minecraft_directory)
+
+def extract_zip_members(
+    handler: zipfile.ZipFile,
+    members: list[tuple[str | zipfile.ZipInfo, str]],
+    minecraft_directory: Optional[str | os.PathLike] = None,
+    max_workers: Optional[int] = None,
+    preserve_mode: bool = False,
+) -> None:
+    """
+    Extract (member, path) pairs from a zip handler.
+    Members are streamed to preallocated files, so memory use does not depend on their size.
+    If the zip is a file on disk, the members are split between workers that each open their own handle,
+    decompression releases the GIL so large archives are extracted on several cores.
+    Raises KeyError for a missing member before anything is extracted.
+    """
+    jobs: list[tuple[zipfile.ZipInfo, str]] = []
+    directories = set()
+    for member, path in members:
+        info = member if isinstance(member, zipfile.ZipInfo) else handler.getinfo(member)
+        path = os.path.abspath(path)
+        if minecraft_directory is not None:
+            check_path_inside_minecraft_directory(minecraft_directory, path)
+        directories.add(os.path.dirname(path))
+        jobs.append((info, path))
+    for directory in directories:
+        os.makedirs(directory, exist_ok=True)
+
+    workers = min(max_workers or os.cpu_count() or 1, len(jobs))
+    zip_path = handler.filename
+    if workers <= 1 or zip_path is None or not os.path.isfile(zip_path):
+        # In archive order, so a zip that is read over the network is read front to back
+        jobs.sort(key=lambda job: job[0].header_offset)
+        _extract_zip_jobs(handler, jobs, preserve_mode)
+        return
+
+    # Largest members first, each going to the least loaded worker
+    batches: list[list[tuple[zipfile.ZipInfo, str]]] = [[] for _ in range(workers)]
+    loads = [0] * workers
+    for job in sorted(jobs, key=lambda job: job[0].compress_size, reverse=True):
+        worker = loads.index(min(loads))
+        batches[worker].append(job)
+        loads[worker] += job[0].compress_size
+
+    def extract_batch(batch: list[tuple[zipfile.ZipInfo, str]]) -> None:
+        with zipfile.ZipFile(zip_path, "r") as worker_handler:
+            _extract_zip_jobs(worker_handler, batch, preserve_mode)
+
+    with concurrent.futures.ThreadPoolExecutor(max_workers=workers) as executor:
+        for future in [executor.submit(extract_batch, batch) for batch in batches]:
+            future.result()
+
+def _extract_zip_jobs(handler: zipfile.ZipFile, jobs: list[tuple[zipfile.ZipInfo, str]], preserve_mode: bool) -> None:
+    for info, path in jobs:
+        with handler.open(info, "r") as src, open(path, "wb") as dst:
+            if info.file_size:
+                _preallocate(dst, info.file_size)
+            shutil.copyfileobj(src, dst, 1024 * 1024)
+        if preserve_mode and platform.system() != "Windows":
+            mode = (info.external_attr >> 16) & 0o777
+            os.chmod(path, mode or 0o755)
+
+def _preallocate(f: Any, size: int) -> None:
+    """Reserve the space of a file before writing it, so it is not fragmented."""
+    if hasattr(os, "posix_fallocate"):
+        try:
+            os.posix_fallocate(f.fileno(), 0, size)
+            return
+        except OSError:
+            pass
+    f.truncate(size)
 
 def assert_func(expression: bool) -> None:
     """
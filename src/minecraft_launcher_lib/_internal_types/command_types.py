@@ -0,0 +1,27 @@
+# This file is part of minecraft-launcher-lib (https://codeberg.org/JakobDev/minecraft-launcher-lib)
+# SPDX-FileCopyrightText: Copyright (c) 2019-2025 JakobDev <jakobdev@gmx.de> and contributors
+# SPDX-License-Identifier: BSD-2-Clause
+from typing import TypedDict, Union
+
+from .shared_types import ClientJsonArgumentRule
+
+
+class _LaunchManifestLogging(TypedDict):
+    argument: str
+    file: str
+
+
+class LaunchManifest(TypedDict, total=False):
+    formatVersion: int
+    sources: dict[str, float]
+    id: str
+    assets: str
+    type: str
+    javaComponent: str
+    javaMajorVersion: int
+    classpath: str
+    mainClass: str
+    logging: _LaunchManifestLogging
+    jvm: list[Union[str, ClientJsonArgumentRule]]
+    game: list[Union[str, ClientJsonArgumentRule]]
+    legacyArguments: list[str]
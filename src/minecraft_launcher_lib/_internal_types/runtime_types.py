@@ -34,3 +34,17 @@ class _PlatformManifestJsonFile(TypedDict, total=False):
 
 class PlatformManifestJson(TypedDict):
     files: dict[str, _PlatformManifestJsonFile]
+
+
+class AzulPackage(TypedDict, total=False):
+    package_uuid: str
+    name: str
+    java_version: list[int]
+    distro_version: list[int]
+    download_url: str
+    latest: bool
+
+
+class RuntimeManifest(TypedDict):
+    version: str
+    files: dict[str, int]
@@ -5,6 +5,7 @@
 import copy
 import json
 import os
+import re
 from typing import List, Union
 
 from ._helper import (
@@ -13,14 +14,21 @@ from ._helper import (
     inherit_json,
     parse_rule_list,
 )
+from ._internal_types.command_types import LaunchManifest
 from ._internal_types.shared_types import ClientJson, ClientJsonArgumentRule
 from .exceptions import VersionNotFound
+from .java_utils import find_system_java_runtime
 from .natives import get_natives
-from .runtime import get_executable_path
+from .runtime import get_executable_path, get_use_system_java
 from .types import MinecraftOptions
 from .utils import get_library_version
 
-__all__ = ["get_minecraft_command"]
+__all__ = ["get_minecraft_command", "compile_launch_manifest"]
+
+# Increase when the layout of the launch manifest changes
+LAUNCH_MANIFEST_FORMAT_VERSION = 1
+
+_PLACEHOLDER_RE = re.compile(r"\$\{(\w+)\}")
 
 
 def get_libraries(data: ClientJson, path: str) -> str:
@@ -51,87 +59,176 @@ def get_libraries(data: ClientJson, path: str) -> str:
     return sep.join(libs)
 
 
-def replace_arguments(
-    argstr: str,
-    version_data: ClientJson,
-    path: str,
-    options: MinecraftOptions,
-    classpath: str
-) -> str:
+def _compile_arguments(data: List[Union[str, ClientJsonArgumentRule]]) -> List[Union[str, ClientJsonArgumentRule]]:
     """
-    Replace all placeholder in arguments with the needed value
+    Resolves all argument rules that only depend on the system.
+    Rules that depend on the launch options are kept, so they can be checked on every launch.
+    """
+    args: List[Union[str, ClientJsonArgumentRule]] = []
+    for item in data:
+        if isinstance(item, str):
+            args.append(item)
+            continue
+
+        rules = item.get("compatibilityRules", []) + item.get("rules", [])
+        if any("features" in rule for rule in rules):
+            args.append(item)
+            continue
+
+        if not parse_rule_list(rules, {}):
+            continue
+        value = item["value"]
+        if isinstance(value, str):
+            args.append(value)
+        else:
+            args.extend(value)
+    return args
+
+
+def _get_manifest_path(version: str, path: str) -> str:
+    return os.path.join(path, "versions", version, "launch_manifest.json")
+
+
+def _get_manifest_sources(version: str, path: str) -> dict[str, float]:
+    """
+    Returns the mtimes of all json files the launch manifest of a version is built from.
+    """
+    sources: dict[str, float] = {}
+    current: str | None = version
+    while current is not None:
+        json_path = os.path.join(path, "versions", current, f"{current}.json")
+        sources[json_path] = os.path.getmtime(json_path)
+        with open(json_path, "r", encoding="utf-8") as f:
+            current = json.load(f).get("inheritsFrom")
+    return sources
+
+
+def compile_launch_manifest(version: str, minecraft_directory: Union[str, os.PathLike]) -> LaunchManifest:
     """
-    replacements = {
-        "${natives_directory}": options.get("nativesDirectory", ""),
-        "${launcher_name}": options.get("launcherName", "minecraft-launcher-lib"),
-        "${launcher_version}": options.get("launcherVersion", get_library_version()),
-        "${classpath}": classpath,
-        "${auth_player_name}": options.get("username", "{username}"),
-        "${version_name}": version_data["id"],
-        "${game_directory}": options.get("gameDirectory", path),
-        "${assets_root}": os.path.join(path, "assets"),
-        "${assets_index_name}": version_data.get("assets", version_data["id"]),
-        "${auth_uuid}": options.get("uuid", "{uuid}"),
-        "${auth_access_token}": options.get("token", "{token}"),
-        "${user_type}": "msa",
-        "${version_type}": version_data["type"],
-        "${user_properties}": "{}",
-        "${resolution_width}": options.get("resolutionWidth", "854"),
-        "${resolution_height}": options.get("resolutionHeight", "480"),
-        "${game_assets}": os.path.join(path, "assets", "virtual", "legacy"),
-        "${auth_session}": options.get("token", "{token}"),
-        "${library_directory}": os.path.join(path, "libraries"),
-        "${classpath_separator}": get_classpath_separator(),
-        "${quickPlayPath}": options.get("quickPlayPath") or "{quickPlayPath}",
-        "${quickPlaySingleplayer}": options.get("quickPlaySingleplayer") or "{quickPlaySingleplayer}",
-        "${quickPlayMultiplayer}": options.get("quickPlayMultiplayer") or "{quickPlayMultiplayer}",
-        "${quickPlayRealms}": options.get("quickPlayRealms") or "{quickPlayRealms}",
+    Resolves everything that is needed to launch a version and does not depend on the launch options
+    and writes it next to the version json. :func:`get_minecraft_command` uses it as long as the json files don't change.
+
+    :param version: The Minecraft version
+    :param minecraft_directory: The path to your Minecraft directory
+    :raises VersionNotFound: The Minecraft version was not found
+    :return: The launch manifest
+    """
+    path = str(minecraft_directory)
+    json_path = os.path.join(path, "versions", version, f"{version}.json")
+    if not os.path.isfile(json_path):
+        raise VersionNotFound(version)
+
+    sources = _get_manifest_sources(version, path)
+    with open(json_path, "r", encoding="utf-8") as f:
+        data: ClientJson = json.load(f)
+
+    if "inheritsFrom" in data:
+        data = inherit_json(data, path)
+
+    manifest: LaunchManifest = {
+        "formatVersion": LAUNCH_MANIFEST_FORMAT_VERSION,
+        "sources": sources,
+        "id": data["id"],
+        "assets": data.get("assets", data["id"]),
+        "type": data["type"],
+        "classpath": get_libraries(data, path),
+        "mainClass": data["mainClass"],
     }
-    for key, value in replacements.items():
-        argstr = argstr.replace(key, value)
-    return argstr
+    if "javaVersion" in data:
+        manifest["javaComponent"] = data["javaVersion"]["component"]
+        manifest["javaMajorVersion"] = data["javaVersion"]["majorVersion"]
 
+    logging_data = data.get("logging", {}).get("client")
+    if logging_data:
+        manifest["logging"] = {
+            "argument": logging_data["argument"],
+            "file": logging_data["file"]["id"],
+        }
 
-def get_arguments_string(
-    version_data: ClientJson,
-    path: str,
-    options: MinecraftOptions,
-    classpath: str
-) -> List[str]:
+    arguments = data.get("arguments")
+    if isinstance(arguments, dict) and "jvm" in arguments:
+        manifest["jvm"] = _compile_arguments(arguments["jvm"])
+    if "minecraftArguments" in data:
+        manifest["legacyArguments"] = data["minecraftArguments"].split()
+    else:
+        manifest["game"] = _compile_arguments(arguments["game"])
+
+    with open(_get_manifest_path(version, path), "w", encoding="utf-8") as f:
+        json.dump(manifest, f)
+
+    return manifest
+
+
+def _load_launch_manifest(version: str, path: str) -> LaunchManifest:
     """
-    Turns the argument string from the client.json into a list
+    Returns the launch manifest of a version. It is compiled again if one of the json files changed.
     """
-    args = [
-        replace_arguments(arg, version_data, path, options, classpath)
-        for arg in version_data["minecraftArguments"].split()
-    ]
+    try:
+        with open(_get_manifest_path(version, path), "r", encoding="utf-8") as f:
+            manifest: LaunchManifest = json.load(f)
+        if (
+            manifest.get("formatVersion") == LAUNCH_MANIFEST_FORMAT_VERSION
+            and all(os.path.getmtime(source) == mtime for source, mtime in manifest["sources"].items())
+        ):
+            return manifest
+    except (OSError, ValueError, KeyError):
+        pass
+    return compile_launch_manifest(version, path)
 
-    if options.get("customResolution", False):
-        args += [
-            "--width", options.get("resolutionWidth", "854"),
-            "--height", options.get("resolutionHeight", "480")
-        ]
 
-    if options.get("demo", False):
-        args.append("--demo")
+def _get_replacements(manifest: LaunchManifest, path: str, options: MinecraftOptions) -> dict[str, str]:
+    """
+    Returns the values of all placeholders in the arguments
+    """
+    return {
+        "natives_directory": options.get("nativesDirectory", ""),
+        "launcher_name": options.get("launcherName", "minecraft-launcher-lib"),
+        "launcher_version": options.get("launcherVersion", get_library_version()),
+        "classpath": manifest["classpath"],
+        "auth_player_name": options.get("username", "{username}"),
+        "version_name": manifest["id"],
+        "game_directory": options.get("gameDirectory", path),
+        "assets_root": os.path.join(path, "assets"),
+        "assets_index_name": manifest["assets"],
+        "auth_uuid": options.get("uuid", "{uuid}"),
+        "auth_access_token": options.get("token", "{token}"),
+        "user_type": "msa",
+        "version_type": manifest["type"],
+        "user_properties": "{}",
+        "resolution_width": options.get("resolutionWidth", "854"),
+        "resolution_height": options.get("resolutionHeight", "480"),
+        "game_assets": os.path.join(path, "assets", "virtual", "legacy"),
+        "auth_session": options.get("token", "{token}"),
+        "library_directory": os.path.join(path, "libraries"),
+        "classpath_separator": get_classpath_separator(),
+        "quickPlayPath": options.get("quickPlayPath") or "{quickPlayPath}",
+        "quickPlaySingleplayer": options.get("quickPlaySingleplayer") or "{quickPlaySingleplayer}",
+        "quickPlayMultiplayer": options.get("quickPlayMultiplayer") or "{quickPlayMultiplayer}",
+        "quickPlayRealms": options.get("quickPlayRealms") or "{quickPlayRealms}",
+    }
 
-    return args
+
+def replace_arguments(argstr: str, replacements: dict[str, str]) -> str:
+    """
+    Replace all placeholder in arguments with the needed value
+    """
+    if "${" not in argstr:
+        return argstr
+    return _PLACEHOLDER_RE.sub(lambda m: replacements.get(m.group(1), m.group(0)), argstr)
 
 
 def get_arguments(
     data: List[Union[str, ClientJsonArgumentRule]],
-    version_data: ClientJson,
-    path: str,
+    replacements: dict[str, str],
     options: MinecraftOptions,
-    classpath: str
 ) -> List[str]:
     """
-    Returns all arguments from the client.json
+    Returns all arguments from a compiled argument list
     """
     args: List[str] = []
     for item in data:
         if isinstance(item, str):
-            args.append(replace_arguments(item, version_data, path, options, classpath))
+            args.append(replace_arguments(item, replacements))
             continue
 
         # Handle rules
@@ -143,12 +240,9 @@ def get_arguments(
 
         value = item["value"]
         if isinstance(value, str):
-            args.append(replace_arguments(value, version_data, path, options, classpath))
+            args.append(replace_arguments(value, replacements))
         else:
-            args.extend(
-                replace_arguments(v, version_data, path, options, classpath)
-                for v in value
-            )
+            args.extend(replace_arguments(v, replacements) for v in value)
     return args
 
 
@@ -159,6 +253,7 @@ def get_minecraft_command(
 ) -> List[str]:
     """
     Returns the command for running minecraft as list.
+    Raises FileNotFoundError if the version needs a runtime that is not installed and system Java is turned off.
     """
     path = str(minecraft_directory)
     version_dir = os.path.join(path, "versions", version)
@@ -166,24 +261,24 @@ def get_minecraft_command(
         raise VersionNotFound(version)
 
     options = copy.deepcopy(options)
-    json_path = os.path.join(version_dir, f"{version}.json")
-    with open(json_path, "r", encoding="utf-8") as f:
-        data: ClientJson = json.load(f)
-
-    if "inheritsFrom" in data:
-        data = inherit_json(data, path)
+    manifest = _load_launch_manifest(version, path)
 
     options.setdefault(
         "nativesDirectory",
-        os.path.join(path, "versions", data["id"], "natives")
+        os.path.join(path, "versions", manifest["id"], "natives")
     )
-    classpath = get_libraries(data, path)
+    replacements = _get_replacements(manifest, path, options)
 
     # Java executable
     if "executablePath" in options:
         java_exec = options["executablePath"]
-    elif "javaVersion" in data:
-        java_exec = get_executable_path(data["javaVersion"]["component"], path) or "java"
+    elif "javaComponent" in manifest:
+        java_exec = get_executable_path(manifest["javaComponent"], path)
+        if java_exec is None:
+            if not get_use_system_java():
+                raise FileNotFoundError(f"Java runtime {manifest['javaComponent']} is not installed")
+            system_java = find_system_java_runtime(manifest["javaMajorVersion"])
+            java_exec = system_java["java_path"] if system_java else "java"
     else:
         java_exec = options.get("defaultExecutablePath", "java")
 
@@ -194,32 +289,36 @@ def get_minecraft_command(
         command += options["jvmArguments"]
 
     # JVM arguments from client.json
-    arguments = data.get("arguments")
-    if isinstance(arguments, dict) and "jvm" in arguments:
-        command += get_arguments(arguments["jvm"], data, path, options, classpath)
+    if "jvm" in manifest:
+        command += get_arguments(manifest["jvm"], replacements, options)
     else:
         command += [
             f"-Djava.library.path={options['nativesDirectory']}",
-            "-cp", classpath
+            "-cp", manifest["classpath"]
         ]
 
     # Logging config
-    if options.get("enableLoggingConfig", False):
-        logging_data = data.get("logging", {}).get("client")
-        if logging_data:
-            logger_file = os.path.join(
-                path, "assets", "log_configs", logging_data["file"]["id"]
-            )
-            command.append(logging_data["argument"].replace("${path}", logger_file))
+    if options.get("enableLoggingConfig", False) and "logging" in manifest:
+        logger_file = os.path.join(
+            path, "assets", "log_configs", manifest["logging"]["file"]
+        )
+        command.append(manifest["logging"]["argument"].replace("${path}", logger_file))
 
     # Main class
-    command.append(data["mainClass"])
+    command.append(manifest["mainClass"])
 
     # Game arguments
-    if "minecraftArguments" in data:
-        command += get_arguments_string(data, path, options, classpath)
+    if "legacyArguments" in manifest:
+        command += [replace_arguments(arg, replacements) for arg in manifest["legacyArguments"]]
+        if options.get("customResolution", False):
+            command += [
+                "--width", options.get("resolutionWidth", "854"),
+                "--height", options.get("resolutionHeight", "480")
+            ]
+        if options.get("demo", False):
+            command.append("--demo")
     else:
-        command += get_arguments(arguments["game"], data, path, options, classpath)
+        command += get_arguments(manifest["game"], replacements, options)
 
     # Server options
     if "server" in options:
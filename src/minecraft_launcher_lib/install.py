@@ -254,7 +254,6 @@ def do_version_install(
 
     # Install java runtime if needed
     if "javaVersion" in versiondata:
-        callback.get("setStatus", empty)("Завантаження Java...")
         install_jvm_runtime(
             versiondata["javaVersion"]["majorVersion"],
             versiondata["javaVersion"]["component"],
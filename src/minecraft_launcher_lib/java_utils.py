@@ -8,10 +8,13 @@ import os
 import platform
 import re
 import subprocess
+from concurrent.futures import ThreadPoolExecutor
 
 from ._helper import SUBPROCESS_STARTUP_INFO
 from .types import JavaInformation
 
+_java_information_cache: dict[tuple[str, float], JavaInformation] = {}
+
 
 def get_java_information(path: str | os.PathLike) -> JavaInformation:
     """
@@ -28,6 +31,11 @@ def get_java_information(path: str | os.PathLike) -> JavaInformation:
     if not os.path.isfile(java_path):
         raise ValueError(f"{os.path.abspath(java_path)} was not found")
 
+    # Running java is slow, so the result is cached until the binary changes
+    cache_key = (os.path.abspath(java_path), os.path.getmtime(java_path))
+    if cache_key in _java_information_cache:
+        return _java_information_cache[cache_key]
+
     result = subprocess.run(
         [java_path, "-showversion"],
         capture_output=True,
@@ -55,9 +63,23 @@ def get_java_information(path: str | os.PathLike) -> JavaInformation:
             else None
         ),
     }
+    _java_information_cache[cache_key] = information
     return information
 
 
+def get_java_major_version(version: str) -> int:
+    """
+    Returns the major version of a Java version string, e.g. 8 for 1.8.0_292 and 21 for 21.0.5.
+
+    :param version: The version as returned by :func:`get_java_information`
+    :return: The major version
+    """
+    parts = version.split(".")
+    if parts[0] == "1" and len(parts) > 1:
+        return int(parts[1])
+    return int(parts[0].split("_")[0])
+
+
 def _search_java_directory(path: str | os.PathLike) -> list[str]:
     """Helper to find Java installations in a directory."""
     if not os.path.isdir(path):
@@ -111,7 +133,43 @@ def find_system_java_versions_information(
     :param additional_directories: Additional directories to search.
     :return: List of JavaInformation dicts.
     """
-    return [
-        get_java_information(path)
-        for path in find_system_java_versions(additional_directories)
-    ]
+    paths = find_system_java_versions(additional_directories)
+    if not paths:
+        return []
+    # Every installation is probed by running it, so do that in parallel
+    with ThreadPoolExecutor(max_workers=min(len(paths), 8)) as executor:
+        return list(executor.map(get_java_information, paths))
+
+
+def find_system_java_runtime(
+    major_version: int,
+    additional_directories: list[str | os.PathLike] | None = None,
+) -> JavaInformation | None:
+    """
+    Finds a 64 bit Java installation on the system with the given major version.
+    Installations that can't be run are ignored.
+
+    :param major_version: The required Java major version
+    :param additional_directories: Additional directories to search.
+    :return: The JavaInformation of the newest matching installation or None
+    """
+    def probe(path: str) -> JavaInformation | None:
+        try:
+            return get_java_information(path)
+        except (ValueError, OSError):
+            return None
+
+    paths = find_system_java_versions(additional_directories)
+    if not paths:
+        return None
+    with ThreadPoolExecutor(max_workers=min(len(paths), 8)) as executor:
+        candidates = [
+            info
+            for info in executor.map(probe, paths)
+            if info is not None
+            and info["is_64bit"]
+            and get_java_major_version(info["version"]) == major_version
+        ]
+    if not candidates:
+        return None
+    return max(candidates, key=lambda info: [int(p) for p in re.split(r"[._]", info["version"]) if p.isdigit()])
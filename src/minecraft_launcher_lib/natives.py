@@ -14,7 +14,7 @@ from typing import Literal
 from pathlib import Path
 
 from ._internal_types.shared_types import ClientJson, ClientJsonLibrary
-from ._helper import parse_rule_list, inherit_json, get_library_path
+from ._helper import parse_rule_list, inherit_json, get_library_path, extract_zip_members
 from .exceptions import VersionNotFound
 
 __all__ = ["extract_natives"]
@@ -50,9 +50,12 @@ def extract_natives_file(filename: str, extract_path: str, extract_data: dict[Li
 
     with zipfile.ZipFile(filename, "r") as zf:
         excludes = set(extract_data.get("exclude", []))
-        for member in zf.namelist():
-            if not any(member.startswith(e) for e in excludes):
-                zf.extract(member, extract_path)
+        members = [
+            (info, os.path.join(extract_path, info.filename))
+            for info in zf.infolist()
+            if not info.is_dir() and not any(info.filename.startswith(e) for e in excludes)
+        ]
+        extract_zip_members(zf, members, extract_path)
 
 
 def extract_natives(versionid: str, path: str | os.PathLike, extract_path: str) -> None:
@@ -7,26 +7,45 @@ runtime allows to install the java runtime. This module is used by :func:`~minec
 so you don't need to use it in your code most of the time.
 """
 
+import io
+import json
 import os
 import platform
 import shutil
+import tarfile
+import tempfile
+import time
+import urllib.parse
 import zipfile
-from pathlib import Path
 
 import httpx
 
 from ._helper import (
     check_path_inside_minecraft_directory,
     download_file,
+    empty,
+    extract_zip_members,
     get_client_json,
+    get_requests_response_cache,
     get_user_agent,
 )
+from ._internal_types.runtime_types import AzulPackage, RuntimeManifest
 from .exceptions import PlatformNotSupported, VersionNotFound
+from .java_utils import find_system_java_runtime
 from .types import CallbackDict, VersionRuntimeInformation
 
 # Azul Zulu API endpoint
 AZUL_API = "https://api.azul.com/metadata/v1/zulu/packages"
 
+# Size that is stored in the runtime manifest for links
+_LINK_SIZE = -1
+
+# A complete installed runtime is only checked for a newer build this often (seconds)
+_UPDATE_CHECK_INTERVAL = 7 * 24 * 60 * 60
+
+_shared_runtime_directory: str | None = None
+_use_system_java = True
+
 
 def _get_jvm_platform_string() -> str:
     """Get the name that is used to identify the platform."""
@@ -54,18 +73,36 @@ def get_installed_jvm_runtimes(minecraft_directory: str | os.PathLike) -> list[s
         return []
 
 
-def install_jvm_runtime(
-    jvm_version: str,
-    jvm_mojang_name: str,
-    minecraft_directory: str | os.PathLike,
-    callback: CallbackDict | None = None,
-) -> None:
+def set_shared_runtime_directory(path: str | os.PathLike | None) -> None:
     """
-    Installs the given jvm runtime from Azul Zulu (Azul) as a JRE.
+    Sets a directory in which all jvm runtimes are stored, so that multiple Minecraft directories
+    can share one runtime per Java major version and vendor build.
+    The Minecraft directories only keep a small pointer to the shared runtime.
+    Pass None to install runtimes directly into the Minecraft directory again.
     """
+    global _shared_runtime_directory
+    _shared_runtime_directory = str(path) if path is not None else None
 
-    callback = callback or {}
 
+def set_use_system_java(enabled: bool) -> None:
+    """
+    Sets whether a compatible Java that is installed on the system is used instead of downloading one.
+    A runtime that was downloaded before is kept, so it can be used again when this is turned off
+    or the system Java is removed.
+    """
+    global _use_system_java
+    _use_system_java = enabled
+
+
+def get_use_system_java() -> bool:
+    """
+    Returns whether a Java that is installed on the system may be used, see :func:`set_use_system_java`
+    """
+    return _use_system_java
+
+
+def _get_azul_package(jvm_version: str, archive_type: str = "zip") -> AzulPackage:
+    """Queries the Azul Zulu API for the latest JRE with the given major version."""
     # Map platform to Azul Zulu API params
     system = platform.system()
     arch = platform.machine().lower()
@@ -84,12 +121,11 @@ def install_jvm_runtime(
     else:
         raise PlatformNotSupported(f"Unsupported architecture: {arch}")
 
-    # Query Azul Zulu API for the latest JRE with the requested major version
     params = {
         "java_version": jvm_version,
         "os": os_name,
         "arch": arch_name,
-        "archive_type": "zip",
+        "archive_type": archive_type,
         "java_package_type": "jre",
         "release_status": "ga",
         "latest": "true",
@@ -99,66 +135,284 @@ def install_jvm_runtime(
         "certification": "tck",
         "fx": "false",
     }
-    resp = httpx.get(AZUL_API, params=params, headers={"user-agent": get_user_agent()})
+    resp = get_requests_response_cache(f"{AZUL_API}?{urllib.parse.urlencode(params)}")
     resp.raise_for_status()
-    pkgs = resp.json()
+    pkgs: list[AzulPackage] = resp.json()
     if not pkgs:
         raise VersionNotFound(
             f"No Azul Zulu JRE found for version {jvm_version} on {os_name} {arch_name}"
         )
-    pkg = pkgs[0]
-    download_url = pkg["download_url"]
-    version_name = pkg["java_version"][0]
-    filename = download_url.split("/")[-1]
-
-    # Prepare destination
-    base_path = Path(minecraft_directory) / "runtime" / jvm_mojang_name
-    os.makedirs(base_path, exist_ok=True)
-    archive_path = base_path / filename
-
-    # Clean up old version if exists
-    if archive_path.is_file():
-        archive_path.unlink(missing_ok=True)
-    if base_path.is_dir():
-        shutil.rmtree(base_path, ignore_errors=True)
-        os.makedirs(base_path, exist_ok=True)
+    return pkgs[0]
+
 
-    # Download archive
-    download_file(download_url, str(archive_path), callback=callback)
+def _get_runtime_build_name(pkg: AzulPackage) -> str:
+    """Returns the name of the vendor build, e.g. zulu21.38.21-ca-jre21.0.5-linux_x64"""
+    filename = pkg["download_url"].split("/")[-1]
+    for extension in (".tar.gz", ".zip"):
+        if filename.endswith(extension):
+            return filename[: -len(extension)]
+    return filename
 
-    # Extract archive
+
+def _resolve_runtime_path(path: str | os.PathLike) -> str:
+    """Follows the pointer that is written into a Minecraft directory when a shared runtime is used."""
+    location_path = os.path.join(path, ".location")
+    if not os.path.isfile(location_path):
+        return str(path)
+    with open(location_path, "r", encoding="utf-8") as f:
+        location = f.read().strip()
+    return os.path.normpath(os.path.join(path, location))
+
+
+def _read_runtime_manifest(path: str | os.PathLike) -> RuntimeManifest | None:
+    """Reads the manifest of an installed runtime. Returns None if the runtime is not installed."""
+    try:
+        with open(os.path.join(path, ".manifest.json"), "r", encoding="utf-8") as f:
+            manifest: RuntimeManifest = json.load(f)
+        with open(os.path.join(path, ".version"), "r", encoding="utf-8") as f:
+            if f.read().strip() != manifest["version"]:
+                return None
+    except (OSError, ValueError, KeyError):
+        return None
+    return manifest
+
+
+def _is_update_check_due(path: str | os.PathLike) -> bool:
+    """The manifest is touched after every check, its mtime is the time of the last check."""
+    try:
+        checked = os.path.getmtime(os.path.join(path, ".manifest.json"))
+    except OSError:
+        return True
+    return time.time() - checked >= _UPDATE_CHECK_INTERVAL
+
+
+def _get_missing_runtime_files(path: str | os.PathLike, manifest: RuntimeManifest) -> set[str]:
+    """Returns all files from the manifest that are missing or have the wrong size."""
+    missing: set[str] = set()
+    for name, size in manifest["files"].items():
+        if size == _LINK_SIZE:
+            if not os.path.lexists(os.path.join(path, name)):
+                missing.add(name)
+            continue
+        try:
+            if os.path.getsize(os.path.join(path, name)) != size:
+                missing.add(name)
+        except OSError:
+            missing.add(name)
+    return missing
+
+
+def _extract_runtime_archive(
+    archive_path: str | os.PathLike,
+    base_path: str | os.PathLike,
+    only: set[str] | None = None,
+) -> dict[str, int]:
+    """
+    Extracts a runtime archive directly into base_path, stripping the top level directory Azul puts everything in.
+    If only is given, just these files are extracted. Returns a dict with the size of all files in the archive.
+    """
+    files: dict[str, int] = {}
     with zipfile.ZipFile(archive_path, "r") as zf:
-        zf.extractall(base_path)
-
-    # Optionally move contents up if Azul puts them in a subdir
-    extracted_dirs = [d for d in base_path.iterdir() if d.is_dir()]
-    if len(extracted_dirs) == 1:
-        for item in extracted_dirs[0].iterdir():
-            shutil.move(str(item), str(base_path))
-        extracted_dirs[0].rmdir()
-
-    # Clean up
-    archive_path.unlink(missing_ok=True)
-    # Write .version file
-    version_path = Path(minecraft_directory) / "runtime" / jvm_mojang_name / ".version"
-    check_path_inside_minecraft_directory(minecraft_directory, str(version_path))
-    with open(version_path, "w", encoding="utf-8") as f:
-        f.write(str(version_name))
-
-    # make java executable (linux)
-    if system == "Linux":
-        # make all files executable 
-        for root, _, files in os.walk(base_path):
-            # Skip if the file is already executable
-            for file in files:
-                file_path = os.path.join(root, file)
-                if os.access(file_path, os.X_OK):
-                    continue
-                try:
-                    os.chmod(file_path, 0o755)
-                except PermissionError:
-                    pass
-        
+        members = []
+        for info in zf.infolist():
+            if info.is_dir():
+                continue
+            name = info.filename.split("/", 1)[-1]
+            files[name] = info.file_size
+            if only is not None and name not in only:
+                continue
+            members.append((info, os.path.join(base_path, name)))
+        extract_zip_members(zf, members, base_path, preserve_mode=True)
+    return files
+
+
+class _ResponseReader(io.RawIOBase):
+    """Wraps a streamed response, so tarfile can read from it while it is being downloaded."""
+
+    def __init__(self, response: httpx.Response, callback: CallbackDict) -> None:
+        self._chunks = response.iter_bytes(chunk_size=1024 * 64)
+        self._buffer = b""
+        self._callback = callback
+        self._downloaded = 0
+
+    def readable(self) -> bool:
+        return True
+
+    def readinto(self, b) -> int:  # type: ignore
+        if not self._buffer:
+            self._buffer = next(self._chunks, b"")
+            self._downloaded += len(self._buffer)
+            self._callback.get("setProgress", empty)(self._downloaded)
+        size = min(len(b), len(self._buffer))
+        b[:size] = self._buffer[:size]
+        self._buffer = self._buffer[size:]
+        return size
+
+
+def _stream_runtime_archive(
+    url: str,
+    base_path: str | os.PathLike,
+    only: set[str] | None = None,
+    callback: CallbackDict | None = None,
+    retries: int = 3,
+) -> dict[str, int]:
+    """
+    Downloads a .tar.gz runtime and extracts it while it arrives, so download and extraction overlap.
+    The entries are placed directly in the final layout with their original modes.
+    Works like :func:`_extract_runtime_archive` otherwise.
+    """
+    callback = callback or {}
+    for attempt in range(retries):
+        try:
+            with httpx.stream("GET", url, headers={"user-agent": get_user_agent()}, follow_redirects=True) as response:
+                response.raise_for_status()
+                callback.get("setMax", empty)(int(response.headers.get("Content-Length", 0)))
+                reader = io.BufferedReader(_ResponseReader(response, callback), buffer_size=1024 * 64)
+                with tarfile.open(fileobj=reader, mode="r|gz") as tf:
+                    return _extract_tar_members(tf, base_path, only)
+        except (httpx.HTTPError, tarfile.TarError, EOFError):
+            if attempt == retries - 1:
+                raise
+            callback.get("setStatus", empty)(f"Помилка завантаження, повторна спроба {attempt + 1}...")
+    return {}
+
+
+def _extract_tar_members(tf: tarfile.TarFile, base_path: str | os.PathLike, only: set[str] | None) -> dict[str, int]:
+    """Extracts the members of a tar stream in the order they arrive."""
+    files: dict[str, int] = {}
+    for member in tf:
+        if member.isdir() or "/" not in member.name:
+            continue
+        name = member.name.split("/", 1)[1]
+        files[name] = _LINK_SIZE if member.issym() or member.islnk() else member.size
+        if only is not None and name not in only:
+            continue
+        target = os.path.join(base_path, name)
+        check_path_inside_minecraft_directory(base_path, target)
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        if os.path.lexists(target):
+            os.unlink(target)
+        if member.issym():
+            check_path_inside_minecraft_directory(base_path, os.path.join(os.path.dirname(target), member.linkname))
+            os.symlink(member.linkname, target)
+            continue
+        if member.islnk():
+            source = os.path.join(base_path, member.linkname.split("/", 1)[-1])
+            check_path_inside_minecraft_directory(base_path, source)
+            shutil.copyfile(source, target)
+        else:
+            src = tf.extractfile(member)
+            if src is None:
+                continue
+            with src, open(target, "wb") as dst:
+                shutil.copyfileobj(src, dst, 1024 * 256)
+        os.chmod(target, member.mode & 0o777)
+    return files
+
+
+def _link_runtime(runtime_path: str, link_path: str, build_name: str) -> None:
+    """Points link_path to a shared runtime and removes an old full runtime that may still be there."""
+    if not os.path.isfile(os.path.join(link_path, ".location")):
+        shutil.rmtree(link_path, ignore_errors=True)
+    os.makedirs(link_path, exist_ok=True)
+    try:
+        location = os.path.relpath(runtime_path, link_path)
+    except ValueError:
+        # The runtime is on another drive (Windows)
+        location = runtime_path
+    with open(os.path.join(link_path, ".location"), "w", encoding="utf-8") as f:
+        f.write(location)
+    with open(os.path.join(link_path, ".version"), "w", encoding="utf-8") as f:
+        f.write(build_name)
+
+
+def install_jvm_runtime(
+    jvm_version: str,
+    jvm_mojang_name: str,
+    minecraft_directory: str | os.PathLike,
+    callback: CallbackDict | None = None,
+) -> None:
+    """
+    Installs the given jvm runtime from Azul Zulu (Azul) as a JRE.
+    If the runtime is already installed and up to date, only missing files are restored.
+    If a 64 bit Java with the same major version is installed on the system, it is used instead,
+    unless this is turned off with :func:`set_use_system_java`.
+    """
+
+    callback = callback or {}
+    link_path = os.path.join(minecraft_directory, "runtime", jvm_mojang_name)
+
+    # Kept next to the installed runtime, which stays as a fallback
+    system_path = os.path.join(link_path, ".system")
+    if _use_system_java:
+        callback.get("setStatus", empty)("Пошук Java...")
+        system_java = find_system_java_runtime(int(jvm_version))
+        if system_java is not None:
+            os.makedirs(link_path, exist_ok=True)
+            with open(system_path, "w", encoding="utf-8") as f:
+                f.write(system_java["path"])
+            return
+    if os.path.isfile(system_path):
+        os.unlink(system_path)
+
+    installed_path = _resolve_runtime_path(link_path)
+    installed = _read_runtime_manifest(installed_path)
+    if (
+        installed is not None
+        and not _is_update_check_due(installed_path)
+        and not _get_missing_runtime_files(installed_path, installed)
+    ):
+        return
+
+    # On Linux the tar.gz can be extracted while it is downloading
+    archive_type = "tar.gz" if platform.system() == "Linux" else "zip"
+    try:
+        pkg = _get_azul_package(jvm_version, archive_type)
+    except httpx.HTTPError:
+        # Offline: keep using the installed runtime if there is one
+        if installed is not None:
+            return
+        raise
+    build_name = _get_runtime_build_name(pkg)
+
+    if _shared_runtime_directory is not None:
+        base_path = os.path.join(_shared_runtime_directory, build_name)
+    else:
+        base_path = link_path
+        check_path_inside_minecraft_directory(minecraft_directory, base_path)
+
+    manifest = _read_runtime_manifest(base_path)
+    if manifest is not None and manifest["version"] == build_name:
+        missing = _get_missing_runtime_files(base_path, manifest)
+    else:
+        missing = None
+
+    if missing is None or missing:
+        callback.get("setStatus", empty)("Завантаження Java...")
+        if missing is None:
+            # Clean up old version if exists
+            shutil.rmtree(base_path, ignore_errors=True)
+        os.makedirs(base_path, exist_ok=True)
+
+        if archive_type == "tar.gz":
+            files = _stream_runtime_archive(pkg["download_url"], base_path, only=missing, callback=callback)
+        else:
+            with tempfile.TemporaryDirectory(prefix="minecraft-launcher-lib-runtime-") as tempdir:
+                archive_path = os.path.join(tempdir, pkg["download_url"].split("/")[-1])
+                download_file(pkg["download_url"], archive_path, callback=callback, overwrite=True)
+                files = _extract_runtime_archive(archive_path, base_path, only=missing)
+
+        # Write the manifest before the .version file, so an interrupted install is never considered complete
+        with open(os.path.join(base_path, ".manifest.json"), "w", encoding="utf-8") as f:
+            json.dump({"version": build_name, "files": files}, f)
+        with open(os.path.join(base_path, ".version"), "w", encoding="utf-8") as f:
+            f.write(build_name)
+    else:
+        # Still the latest build, check again after the interval
+        os.utime(os.path.join(base_path, ".manifest.json"))
+
+    if _shared_runtime_directory is not None:
+        _link_runtime(base_path, link_path, build_name)
 
 
 def get_executable_path(
@@ -166,8 +420,19 @@ def get_executable_path(
 ) -> str | None:
     """
     Returns the path to the executable. Returns None if none is found.
+    A system Java that was chosen on install is used as long as it still exists and system Java is not turned off.
     """
-    base = os.path.join(minecraft_directory, "runtime", jvm_version)
+    link_path = os.path.join(minecraft_directory, "runtime", jvm_version)
+    system_path = os.path.join(link_path, ".system")
+    if _use_system_java and os.path.isfile(system_path):
+        with open(system_path, "r", encoding="utf-8") as f:
+            java_path = _find_java_executable(f.read().strip())
+        if java_path is not None:
+            return java_path
+    return _find_java_executable(_resolve_runtime_path(link_path))
+
+
+def _find_java_executable(base: str) -> str | None:
     java_path = os.path.join(base, "bin", "java")
     if os.path.isfile(java_path):
         return java_path
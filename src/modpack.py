@@ -1,18 +1,19 @@
-from datetime import datetime
-import time
 import hashlib
 import json
 import logging
 import os
 import zipfile
+import zlib
 from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
 from dataclasses import dataclass
 from pathlib import Path
-from typing import Callable, Dict, Optional
+from typing import Callable, Dict, Iterator, Optional
 
 import httpx
 import minecraft_launcher_lib as mcl
 
+from cds import cds
 from config import (
     APPDATA_FOLDER,
     AUTHLIB_INJECTOR_URL,
@@ -21,12 +22,21 @@ from config import (
     MODPACK_REPO,
     MODPACK_REPO_URL,
 )
+from file_records import file_records
+from github_api import github_api
+from jvm_tuning import jvm_tuner
+from override_sync import OVERRIDE_FOLDERS, override_sync
+from remote_zip import RangeNotSupported, RemoteFile
 from minecraft_launcher_lib._helper import (
-    check_path_inside_minecraft_directory,
     download_file,
     empty,
+    extract_zip_members,
 )
 from settings import settings
+from update_staging import update_staging
+
+# Installed files are hashed in chunks of this size
+HASH_BUFFER_SIZE = 1024 * 1024
 
 
 @dataclass
@@ -78,6 +88,8 @@ class Modpack:
         self._remote_modpacks: list[str] = []
         self._selected: Optional[str] = None
         self._mrpack_path = None
+        # ETag of the loaded index
+        self._etag: Optional[str] = None
         self._setup_paths()
         self._load_installed_modpacks()
         self.fetch_modpacks()
@@ -107,56 +119,15 @@ class Modpack:
         self._installed_modpacks = temp.modpacks
 
     def fetch_modpacks(self) -> None:
-        # Check cache first
-        cache_file = APPDATA_FOLDER / "modpacks_cache.json"
-        cache_duration = 600  # 10 minutes in seconds
-
-        if cache_file.exists():
-            try:
-                with open(cache_file, "r") as f:
-                    cache_data = json.load(f)
-
-                # Check if cache is still valid (5 minutes)
-                if time.time() - cache_data.get("timestamp", 0) < cache_duration:
-                    self._remote_modpacks = cache_data.get("modpacks", [])
-                    return
-            except (json.JSONDecodeError, KeyError):
-                pass
-
-        # Fetch from API if cache is invalid or doesn't exist
         try:
-            resp = httpx.get(
-                f"https://api.github.com/repos/{MODPACK_REPO}/branches",
-                follow_redirects=True,
-                timeout=30,
-            )
-            if resp.status_code == 200:
-                branches = resp.json()
-                modpacks = []
-                for branch in branches:
-                    name = branch.get("name")
-                    if not name:
-                        continue
-                    modpacks.append(name)
-
-                self._remote_modpacks = modpacks
-
-                # Save to cache
-                cache_data = {"modpacks": modpacks, "timestamp": time.time()}
-                with open(cache_file, "w") as f:
-                    json.dump(cache_data, f)
-            else:
-                # get rate limit expire time
-                rate_limit_reset = resp.headers.get("X-RateLimit-Reset")
-                if rate_limit_reset:
-                    reset_time = datetime.fromtimestamp(int(rate_limit_reset))
-                    logging.info(f"Rate limit exceeded. Try again at {reset_time}.")
-                else:
-                    logging.info(f"Error fetching modpacks: {resp.status_code}")
-                # apply installed modpacks as remote
-                self._remote_modpacks = list(self._installed_modpacks.keys())
-        except Exception as e:
+            # Branches change rarely, cache them for 10 minutes
+            branches = github_api.get(f"/repos/{MODPACK_REPO}/branches", max_age=600)
+            self._remote_modpacks = [
+                branch["name"] for branch in branches if branch.get("name")
+            ]
+        except httpx.HTTPError as e:
             logging.info(f"Error fetching modpacks: {e}")
+            # apply installed modpacks as remote
             self._remote_modpacks = list(self._installed_modpacks.keys())
 
     def _on_load(self) -> None:
@@ -228,15 +199,6 @@ class Modpack:
         self._installed_modpacks = temp.modpacks
         self._selected = temp.selected
 
-    def _fetch_index_etag(self) -> Optional[str]:
-        """Fetch the latest index etag from GitHub."""
-        try:
-            response = httpx.head(self._index_url, follow_redirects=True)
-            return response.headers.get("etag")
-        except httpx.HTTPError as e:
-            logging.info(f"Error fetching modpack index etag: {e}")
-            return None
-
     def _save_index_etag(self) -> None:
         """Append the current index etag to a file."""
         ...
@@ -245,13 +207,22 @@ class Modpack:
         """Retrieve the saved index etag from a file."""
         ...
 
-    def _fetch_latest_index(self, force: bool = False) -> None:
-        """Fetch the latest index data from GitHub."""
+    def _fetch_latest_index(self, force: bool = False) -> Optional[bool]:
+        """
+        Fetch the latest index data from GitHub. Unless forced, the request
+        is conditional on the ETag of the loaded index. Returns whether the
+        index changed, or None when it could not be fetched.
+        """
+        headers = {}
+        if not force and self._etag and self.modpack_index:
+            headers["If-None-Match"] = self._etag
         try:
-            latest_etag = self._fetch_index_etag()
-            if not force and self._etag and latest_etag == self._etag:
-                return
-            response = httpx.get(self._index_url, follow_redirects=True)
+            response = httpx.get(
+                self._index_url, headers=headers, follow_redirects=True, timeout=30
+            )
+            if response.status_code == 304:
+                return False
+            response.raise_for_status()
             # with open(self._modpack_index_file, "wb") as f:
             #     f.write(response.content)
             json_data = json.loads(response.text)
@@ -278,19 +249,15 @@ class Modpack:
                 )
             self.modpack_index = json_data
             self.remote_version = json_data.get("versionId")
-            self._etag = latest_etag
+            self._etag = response.headers.get("etag")
             self._save_index_etag()
             # logging.info(f"Fetched modpack index: {self.remote_version}")
-        except httpx.HTTPError as e:
+            return True
+        except (httpx.HTTPError, json.JSONDecodeError) as e:
             logging.info(f"Error fetching modpack index: {e}")
             self.modpack_index = None
             self.remote_version = None
-            self._etag = latest_etag
-            self._save_index_etag()
-            # logging.info(f"Fetched modpack index: {self.remote_version}")
-        except httpx.HTTPError as e:
-            logging.info(f"Error fetching modpack index: {e}")
-            self.modpack_index = None
+            return None
 
     def is_up_to_date(self) -> bool:
         """Check if the installed modpack is up to date."""
@@ -331,10 +298,34 @@ class Modpack:
         """Download the modpack file from GitHub repo zip."""
         return self._download_file(self._zip_url, self.modpack_file)
 
+    @contextmanager
+    def _open_modpack_zip(self) -> Iterator[zipfile.ZipFile]:
+        """
+        Open the downloaded modpack zip, or read the remote one with Range
+        requests when it is not on disk. The whole zip is downloaded only
+        when the server does not support ranges.
+        """
+        if not self.modpack_file.exists():
+            try:
+                remote_file = RemoteFile(self._zip_url)
+            except (RangeNotSupported, httpx.HTTPError) as e:
+                logging.info(f"Can't read the modpack zip remotely: {e}")
+            else:
+                try:
+                    with zipfile.ZipFile(remote_file, "r") as zf:
+                        yield zf
+                finally:
+                    remote_file.close()
+                return
+            if not self._download_modpack():
+                raise RuntimeError("Failed to download modpack")
+        with zipfile.ZipFile(self.modpack_file, "r") as zf:
+            yield zf
+
     def _get_modpack_info(self) -> Dict:
         """Extract and parse modpack information from the .mrpack file."""
         try:
-            with zipfile.ZipFile(self.modpack_file, "r") as zf:
+            with self._open_modpack_zip() as zf:
                 with zf.open(f"modpack-{self._selected}/modrinth.index.json") as f:
                     return json.load(f)
         except (zipfile.BadZipFile, KeyError, json.JSONDecodeError) as e:
@@ -342,14 +333,17 @@ class Modpack:
 
     def install_mrpack(
         self,
-        path: str | os.PathLike,
+        path: str | os.PathLike | None = None,
         modpack_directory: str | os.PathLike | None = None,
         callback: mcl.types.CallbackDict | None = None,
         mrpack_install_options: mcl.mrpack.MrpackInstallOptions | None = None,
         max_workers: int | None = 8,
     ) -> None:
+        """
+        Install the modpack from path, or from the modpack zip of the
+        selected branch, read remotely when possible.
+        """
         # https://codeberg.org/JakobDev/minecraft-launcher-lib/src/branch/master/minecraft_launcher_lib/mrpack.py
-        path = os.path.abspath(path)
 
         minecraft_directory = os.path.abspath(settings.minecraft_directory)
         modpack_directory = Path(minecraft_directory) / "modpacks" / self._selected
@@ -360,48 +354,75 @@ class Modpack:
         if mrpack_install_options is None:
             mrpack_install_options = {}
 
-        with zipfile.ZipFile(path, "r") as zf:
+        if path is None:
+            modpack_zip = self._open_modpack_zip()
+        else:
+            modpack_zip = zipfile.ZipFile(os.path.abspath(path), "r")
+
+        with modpack_zip as zf:
             with zf.open(f"modpack-{self._selected}/modrinth.index.json", "r") as f:
                 index: mcl.mrpack.MrpackIndex = json.load(f)
 
-            # Download the files
-            file_list = mcl.mrpack._filter_mrpack_files(
-                index["files"], mrpack_install_options
-            )
-
-            callback.get("setStatus", empty)("Завантаження модів...")
-            callback.get("setMax", empty)(len(file_list))
-
-            mods = []
-            for _, file in enumerate(file_list):
-                full_path = os.path.abspath(
-                    os.path.join(modpack_directory, file["path"])
+            self._clean_old_mods(index)
+            with ThreadPoolExecutor(max_workers=1) as executor:
+                # Overrides are extracted while the mods download
+                overrides = executor.submit(self.extract_overrides, zf)
+                self._install_mods(
+                    index,
+                    modpack_directory,
+                    callback,
+                    mrpack_install_options,
+                    max_workers,
                 )
-
-                mods.append(
-                    {
-                        "url": file["downloads"][0],
-                        "path": full_path,
-                        "sha1": file["hashes"]["sha1"],
-                    }
+                overrides.result()
+
+            # apply resource packs from overrides to options.txt, the same
+            # file names the file level update passes
+            file_names = []
+            for folder in OVERRIDE_FOLDERS:
+                prefix = f"modpack-{self._selected}/{folder}"
+                file_names.extend(
+                    name[len(prefix) :]
+                    for name in zf.namelist()
+                    if name.startswith(prefix)
                 )
+            self.configure_resource_packs(file_names)
 
-            # Clean old mods
-            self._clean_old_mods()
+            if mrpack_install_options.get("skipDependenciesInstall"):
+                return
 
-            # Download the files in parallel
-            self.download_mods(callback, max_workers, mods)
+            self.setup_mod_loaders(modpack_directory, callback, index)
 
-            # Extract the overrides
-            self.extract_overrides(zf)
+    def _install_mods(
+        self,
+        index: mcl.mrpack.MrpackIndex,
+        modpack_directory: str | os.PathLike,
+        callback: mcl.types.CallbackDict,
+        mrpack_install_options: mcl.mrpack.MrpackInstallOptions,
+        max_workers: int | None = 8,
+    ) -> None:
+        # Download the files
+        file_list = mcl.mrpack._filter_mrpack_files(
+            index["files"], mrpack_install_options
+        )
 
-            # apply resource packs from overrides to options.txt
-            self.configure_resource_packs(zf)
+        callback.get("setStatus", empty)("Завантаження модів...")
+        callback.get("setMax", empty)(len(file_list))
 
-            if mrpack_install_options.get("skipDependenciesInstall"):
-                return
+        mods = []
+        for _, file in enumerate(file_list):
+            full_path = os.path.abspath(os.path.join(modpack_directory, file["path"]))
 
-            self.setup_mod_loaders(modpack_directory, callback, index)
+            mods.append(
+                {
+                    "url": file["downloads"][0],
+                    "path": full_path,
+                    "sha1": file["hashes"]["sha1"],
+                }
+            )
+
+        # Download the files in parallel
+        self.download_mods(callback, max_workers, mods)
 
     def setup_mod_loaders(self, modpack_directory, callback, index):
         if "forge" in index["dependencies"]:
@@ -471,17 +492,16 @@ class Modpack:
                 count += 1
                 callback.get("setProgress", empty)(count)
 
-    def configure_resource_packs(self, zf: zipfile.ZipFile) -> None:
-        """Configure resource packs in options.txt."""
+    def configure_resource_packs(self, file_names: list[str]) -> None:
+        """
+        Configure resource packs in options.txt, file_names are relative to
+        the overrides folder.
+        """
         resource_packs = []
-        for zip_name in zf.namelist():
-            if zip_name.startswith(
-                f"modpack-{self._selected}/overrides/resourcepacks/"
-            ):
+        for file_name in file_names:
+            if file_name.startswith("resourcepacks/"):
                 # Remove the prefix and get the pack name
-                pack_name = zip_name[
-                    len(f"modpack-{self._selected}/overrides/resourcepacks/") :
-                ]
+                pack_name = file_name[len("resourcepacks/") :]
                 if pack_name.endswith(".zip"):
                     resource_packs.append(pack_name)
         if resource_packs:
@@ -541,58 +561,77 @@ class Modpack:
                     f.write(f"resourcePacks:[{new_packs}]\n")
 
     def extract_overrides(self, zf: zipfile.ZipFile) -> None:
-        for zip_name in zf.namelist():
-            # Check if the entry is in the overrides and if it is a file
-            if (
-                not zip_name.startswith(f"modpack-{self._selected}/overrides/")
-                and not zip_name.startswith(
-                    f"modpack-{self._selected}/client-overrides/"
-                )
-            ) or zf.getinfo(zip_name).file_size == 0:
-                continue
-
-            # Remove the overrides at the start of the Name
-            if zip_name.startswith(f"modpack-{self._selected}/client-overrides/"):
-                file_name = zip_name[
-                    len(f"modpack-{self._selected}/client-overrides/") :
-                ]
-            else:
-                file_name = zip_name[len(f"modpack-{self._selected}/overrides/") :]
-
-            # Constructs the full Path
-            full_path = os.path.abspath(self.modpack_path / file_name)
-
-            check_path_inside_minecraft_directory(self.modpack_path, full_path)
+        """
+        Extract the overrides. Members whose CRC32 and size match the
+        installed file are skipped, changed ones are extracted in parallel.
+        """
+        records = file_records.load(self.name)
+        changed: dict[str, tuple[zipfile.ZipInfo, str]] = {}
+        skipped = 0
+        try:
+            # GitHub lists the entries alphabetically, the folders are walked
+            # in the order that lets client-overrides win, like the file level
+            # update does
+            for folder in OVERRIDE_FOLDERS:
+                prefix = f"modpack-{self._selected}/{folder}"
+                for info in zf.infolist():
+                    if not info.filename.startswith(prefix) or info.file_size == 0:
+                        continue
+                    file_name = info.filename[len(prefix) :]
 
-            # Skip extracting options.txt if it already exists
-            if os.path.basename(full_path) == "options.txt" and os.path.exists(
-                full_path
-            ):
-                continue
+                    # Constructs the full Path
+                    full_path = os.path.abspath(self.modpack_path / file_name)
 
-            try:
-                os.makedirs(os.path.dirname(full_path))
-            except FileExistsError:
-                pass
+                    # Skip extracting options.txt if it already exists
+                    is_options = os.path.basename(full_path) == "options.txt"
+                    if is_options and os.path.exists(full_path):
+                        continue
 
-            with open(full_path, "wb") as f:
-                f.write(zf.read(zip_name))
+                    # a file of a later folder replaces the one of an earlier
+                    if self._is_extracted(records, file_name, full_path, info):
+                        changed.pop(file_name, None)
+                        skipped += 1
+                        continue
+                    changed[file_name] = (info, full_path)
+
+            # The path is checked once per entry while extracting
+            extract_zip_members(zf, list(changed.values()), self.modpack_path)
+            for file_name, (info, full_path) in changed.items():
+                file_records.set(records, file_name, full_path, crc=info.CRC)
+        finally:
+            file_records.save(self.name, records)
+        logging.info(f"Extracted {len(changed)} overrides, {skipped} unchanged")
+
+    @staticmethod
+    def _is_extracted(
+        records: dict, file_name: str, full_path: str, info: zipfile.ZipInfo
+    ) -> bool:
+        if not os.path.exists(full_path):
+            return False
+        if os.path.getsize(full_path) != info.file_size:
+            return False
+        crc = file_records.get(records, file_name, full_path, "crc")
+        if crc is None:
+            # Installed before records were kept, reading is still cheaper
+            # than rewriting
+            crc = _crc32_file(full_path)
+            file_records.set(records, file_name, full_path, crc=crc)
+        return crc == info.CRC
 
     def install(self, callback: Optional[Callable] = None) -> bool:
         """Install the modpack to the specified Minecraft directory."""
         try:
-            self._ensure_modpack_exists()
             # self._fetch_latest_index(force=True)
 
             # Install the modpack
-            self.install_mrpack(
-                self.modpack_file,
-                callback=callback,
-            )
+            self.install_mrpack(callback=callback)
             # Verify the installation
             if not self.verify_installation():
                 raise RuntimeError("Modpack installation verification failed")
 
+            # Resolve the launch command now, so Play only fills in the user
+            mcl.command.compile_launch_manifest(self.modloader_full, self.modpack_path)
+
             # Save the index file for version tracking
             self._save_modpack_version()
             self._save_index_etag()
@@ -653,19 +692,24 @@ class Modpack:
     def update(self, callback: Optional[dict[Callable]] = None) -> None:
         """Update the modpack to the latest version."""
         self._fetch_latest_index(force=True)
-
-        # Download and install the update
-        if not self._download_modpack():
-            raise RuntimeError("Failed to download modpack update")
+        if callback is None:
+            callback = {}
 
         options = {
             "skipDependenciesInstall": True,
         }
-        self.install_mrpack(
-            self.modpack_file,
-            callback=callback,
-            mrpack_install_options=options,
+        staged_overrides = update_staging.apply(
+            self.name, self.remote_version, self.modpack_path
         )
+        if staged_overrides is not None:
+            # Everything was downloaded in the background, the mods are only
+            # checked against their hashes
+            self._clean_old_mods(self.modpack_index)
+            self._install_mods(self.modpack_index, self.modpack_path, callback, options)
+            self.configure_resource_packs(staged_overrides)
+        elif not self._update_from_tree(callback, options):
+            # Install the update from the whole modpack zip
+            self.install_mrpack(callback=callback, mrpack_install_options=options)
         # Verify the installation
         if not self.verify_installation():
             callback.get("setStatus", empty)(
@@ -682,12 +726,59 @@ class Modpack:
 
         logging.info(f"Modpack {self.name} updated to version {self.remote_version}.")
 
-    def _clean_old_mods(self) -> None:
-        """Remove mods that are no longer needed."""
+    def stage_update(self) -> None:
+        """Start downloading the available update in the background."""
+        if (
+            not self.modpack_index
+            or self.installed_version == "0.0.0"
+            or self.is_up_to_date()
+            or not self.modpack_path.exists()
+        ):
+            return
+        update_staging.start(
+            self.name,
+            self._selected,
+            self.remote_version,
+            self.modpack_index,
+            self.modpack_path,
+        )
+
+    def _update_from_tree(
+        self, callback: dict, options: mcl.mrpack.MrpackInstallOptions
+    ) -> bool:
+        """
+        Download only the override files that changed since the installed
+        version, False when the whole zip has to be downloaded instead.
+        """
+        index = self.modpack_index
+        if not index:
+            return False
+        try:
+            file_names = override_sync.sync(
+                self.name, self._selected, self.modpack_path, callback
+            )
+        except (httpx.HTTPError, OSError, ValueError, KeyError) as e:
+            logging.info(f"File level update failed, downloading the modpack: {e}")
+            return False
+        self._clean_old_mods(index)
+        self._install_mods(index, self.modpack_path, callback, options)
+        self.configure_resource_packs(file_names)
+        return True
+
+    def _clean_old_mods(self, index: Dict) -> None:
+        """Remove mods that are not in the index, the rest is checked by hash."""
         mods_dir = self.modpack_path / "mods"
         if mods_dir.exists():
+            keep = {
+                os.path.normpath(self.modpack_path / file["path"])
+                for file in index.get("files", [])
+            }
             for mod in mods_dir.iterdir():
-                if mod.is_file() and mod.name.endswith(".jar"):
+                if (
+                    mod.is_file()
+                    and mod.name.endswith(".jar")
+                    and os.path.normpath(mod) not in keep
+                ):
                     mod.unlink()
             logging.info("Old mods cleaned up successfully.")
         else:
@@ -743,15 +834,23 @@ class Modpack:
         ]
         if settings.game.java_args:
             options["jvmArguments"].extend(settings.game.java_args)
+        options["jvmArguments"] = jvm_tuner.get_jvm_arguments(
+            self.name, options["jvmArguments"]
+        )
 
         if not self._selected or self._selected not in self._installed_modpacks:
             raise RuntimeError("No modpack selected or modpack not installed")
 
-        return mcl.command.get_minecraft_command(
+        command = mcl.command.get_minecraft_command(
             self.modloader_full,
             self.modpack_path,
             options,
         )
+        # Class Data Sharing flags have to come before the main class
+        command[1:1] = cds.get_jvm_arguments(
+            command, self.modpack_path / "cds", self.modloader_full
+        )
+        return command
 
     def set_modpack(self, modpack_name: Optional[str]) -> None:
         """Set the current modpack."""
@@ -837,5 +936,13 @@ class Modpack:
         return None
 
 
+def _crc32_file(path: str | os.PathLike) -> int:
+    crc = 0
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(HASH_BUFFER_SIZE), b""):
+            crc = zlib.crc32(chunk, crc)
+    return crc
+
+
 # Global modpack instance
 modpack = Modpack()
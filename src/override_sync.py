@@ -0,0 +1,204 @@
+import hashlib
+import logging
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Callable
+from urllib.parse import quote
+
+import httpx
+
+from config import MODPACK_REPO
+from file_records import file_records
+from github_api import github_api
+from minecraft_launcher_lib._helper import check_path_inside_minecraft_directory, empty
+
+# Later folders win when both contain the same file
+OVERRIDE_FOLDERS = ("overrides/", "client-overrides/")
+DOWNLOAD_WORKERS = 8
+DOWNLOAD_CHUNK_SIZE = 1024 * 64
+
+
+class SyncCancelled(Exception):
+    pass
+
+
+def git_blob_sha(path: str | os.PathLike) -> str:
+    """SHA-1 of a file the way git hashes blobs."""
+    sha = hashlib.sha1(b"blob %d\0" % os.path.getsize(path))
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b""):
+            sha.update(chunk)
+    return sha.hexdigest()
+
+
+class OverrideSync:
+    """
+    Updates the overrides of an installed modpack file by file. The git tree
+    of the branch lists the blob SHA of every file, only files whose
+    installed copy hashes differently are downloaded. Blob SHAs of installed
+    files are kept in the file records, so unchanged files are not re-read.
+    """
+
+    def __init__(self):
+        self._client = httpx.Client(follow_redirects=True, timeout=30)
+
+    def get_tree(self, branch: str) -> tuple[str, dict[str, dict]]:
+        """Commit SHA of the branch head and its files by path."""
+        head = github_api.get(
+            f"/repos/{MODPACK_REPO}/branches/{branch}", allow_stale=False
+        )
+        commit = head["commit"]["sha"]
+        # Trees are addressed by their SHA, a new commit means a new listing
+        data = github_api.get(
+            f"/repos/{MODPACK_REPO}/git/trees/{head['commit']['commit']['tree']['sha']}",
+            params={"recursive": 1},
+            cache=False,
+        )
+        if data.get("truncated"):
+            raise ValueError("Tree listing of the modpack is truncated")
+        return commit, {
+            entry["path"]: entry for entry in data["tree"] if entry["type"] == "blob"
+        }
+
+    def sync(
+        self,
+        name: str,
+        branch: str,
+        modpack_path: Path,
+        callback: dict | None = None,
+        destination: Path | None = None,
+        cancelled: threading.Event | None = None,
+        max_workers: int = DOWNLOAD_WORKERS,
+        initializer: Callable | None = None,
+    ) -> list[str]:
+        """
+        Bring the overrides of modpack_path up to date with the branch and
+        return the override file names. With a destination the changed files
+        are downloaded there instead, keeping the same layout. Raises
+        httpx.HTTPError, OSError or ValueError when the whole zip has to be
+        used instead, SyncCancelled soon after cancelled is set. The
+        download threads run initializer first.
+        """
+        callback = callback or {}
+        commit, tree = self.get_tree(branch)
+        targets: dict[str, str] = {}
+        for folder in OVERRIDE_FOLDERS:
+            for path, entry in tree.items():
+                # empty files are skipped when extracting the zip as well
+                if path.startswith(folder) and entry.get("size"):
+                    targets[path[len(folder) :]] = path
+
+        cancelled = cancelled or threading.Event()
+        records = file_records.load(name)
+        changed = []
+        for file_name, path in targets.items():
+            if cancelled.is_set():
+                file_records.save(name, records)
+                raise SyncCancelled(f"Sync of {name} was cancelled")
+            full_path = os.path.abspath(modpack_path / file_name)
+            check_path_inside_minecraft_directory(modpack_path, full_path)
+            # options.txt belongs to the player once it exists
+            if os.path.basename(full_path) == "options.txt" and os.path.exists(
+                full_path
+            ):
+                continue
+            if self._installed_sha(records, file_name, full_path) == tree[path]["sha"]:
+                continue
+            if destination is not None:
+                full_path = os.path.abspath(destination / file_name)
+                check_path_inside_minecraft_directory(destination, full_path)
+                # already downloaded by an earlier, interrupted run
+                if (
+                    os.path.exists(full_path)
+                    and git_blob_sha(full_path) == tree[path]["sha"]
+                ):
+                    continue
+            changed.append((file_name, tree[path], full_path))
+
+        total = sum(entry["size"] for _, entry, _ in changed)
+        logging.info(
+            f"{len(changed)} of {len(targets)} override files changed ({total} bytes)"
+        )
+        callback.get("setStatus", empty)("Оновлення файлів модпаку...")
+        callback.get("setMax", empty)(total)
+        callback.get("setProgress", empty)(0)
+        downloaded = 0
+        progress_lock = threading.Lock()
+
+        def on_chunk(size: int) -> None:
+            nonlocal downloaded
+            with progress_lock:
+                downloaded += size
+                callback.get("setProgress", empty)(downloaded)
+
+        try:
+            with ThreadPoolExecutor(
+                max_workers=max_workers, initializer=initializer
+            ) as executor:
+                futures = [
+                    executor.submit(
+                        self._download_blob,
+                        commit,
+                        entry,
+                        full_path,
+                        on_chunk,
+                        cancelled,
+                    )
+                    for _, entry, full_path in changed
+                ]
+                for future in futures:
+                    future.result()
+            if destination is None:
+                for file_name, entry, full_path in changed:
+                    file_records.set(records, file_name, full_path, sha=entry["sha"])
+        finally:
+            file_records.save(name, records)
+        return list(targets)
+
+    def _download_blob(
+        self,
+        commit: str,
+        entry: dict,
+        full_path: str,
+        on_chunk: Callable,
+        cancelled: threading.Event,
+    ) -> None:
+        path = entry["path"]
+        if cancelled.is_set():
+            raise SyncCancelled(f"Download of {path} was cancelled")
+        url = f"https://raw.githubusercontent.com/{MODPACK_REPO}/{commit}/{quote(path)}"
+        part = f"{full_path}.part"
+        os.makedirs(os.path.dirname(full_path), exist_ok=True)
+        sha = hashlib.sha1(b"blob %d\0" % entry["size"])
+        try:
+            with self._client.stream("GET", url) as response:
+                response.raise_for_status()
+                with open(part, "wb") as f:
+                    for chunk in response.iter_bytes(DOWNLOAD_CHUNK_SIZE):
+                        if cancelled.is_set():
+                            raise SyncCancelled(f"Download of {path} was cancelled")
+                        f.write(chunk)
+                        sha.update(chunk)
+                        on_chunk(len(chunk))
+            if sha.hexdigest() != entry["sha"]:
+                raise ValueError(f"Blob hash mismatch for {path}")
+            os.replace(part, full_path)
+        except BaseException:
+            if os.path.exists(part):
+                os.unlink(part)
+            raise
+
+    @staticmethod
+    def _installed_sha(records: dict, file_name: str, full_path: str) -> str | None:
+        if not os.path.exists(full_path):
+            return None
+        sha = file_records.get(records, file_name, full_path, "sha")
+        if sha is None:
+            sha = git_blob_sha(full_path)
+            file_records.set(records, file_name, full_path, sha=sha)
+        return sha
+
+
+override_sync = OverrideSync()
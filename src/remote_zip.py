@@ -0,0 +1,170 @@
+import io
+import logging
+import re
+import threading
+
+import httpx
+
+# The end of central directory record is at most 22 bytes plus a 64 KiB
+# comment, one request covers it and usually the whole central directory
+TAIL_SIZE = 1024 * 256
+# Forward gaps up to this size are read through on the open response
+# instead of starting a new request
+SKIP_SIZE = 1024 * 1024
+STREAM_CHUNK_SIZE = 1024 * 64
+
+CONTENT_RANGE = re.compile(r"bytes (\d+)-(\d+)/(\d+)")
+
+
+class RangeNotSupported(Exception):
+    pass
+
+
+class ArchiveChanged(OSError):
+    pass
+
+
+class RemoteFile(io.RawIOBase):
+    """
+    Seekable read-only file over HTTP Range requests. Passed to
+    zipfile.ZipFile it reads the central directory from the end of the
+    archive and every member on demand, without downloading the rest.
+    Reads past the tail stream from one open-ended range response for as
+    long as they move forward. Every range is conditional on the validator
+    of the first response, so all bytes come from the same archive.
+    """
+
+    def __init__(self, url: str, client: httpx.Client | None = None):
+        super().__init__()
+        self._own_client = client is None
+        self._client = client or httpx.Client(follow_redirects=True, timeout=60)
+        self._lock = threading.Lock()
+        self._position = 0
+        self._url = url
+        self._stream: httpx.Response | None = None
+        self._chunks = iter(())
+        self._pending = b""
+        self._stream_position = 0
+        self.requests = 0
+        try:
+            response = self._client.get(url, headers={"Range": f"bytes=-{TAIL_SIZE}"})
+            if response.status_code != 206:
+                raise RangeNotSupported(f"{url} answered {response.status_code}")
+            match = CONTENT_RANGE.match(response.headers.get("Content-Range", ""))
+            if not match:
+                raise RangeNotSupported(f"{url} sent no usable Content-Range")
+            # If-Range needs a strong validator
+            validator = response.headers.get("ETag", "")
+            if not validator or validator.startswith("W/"):
+                validator = response.headers.get("Last-Modified", "")
+            if not validator:
+                raise RangeNotSupported(f"{url} sent no validator for If-Range")
+        except Exception:
+            self.close()
+            raise
+        # Ask the redirect target directly from now on
+        self._url = str(response.url)
+        self._validator = validator
+        self.size = int(match.group(3))
+        self._buffer_start = int(match.group(1))
+        self._buffer = response.content
+        self.requests = 1
+
+    def readable(self) -> bool:
+        return True
+
+    def seekable(self) -> bool:
+        return True
+
+    def tell(self) -> int:
+        return self._position
+
+    def seek(self, offset: int, whence: int = io.SEEK_SET) -> int:
+        if whence == io.SEEK_SET:
+            self._position = offset
+        elif whence == io.SEEK_CUR:
+            self._position += offset
+        elif whence == io.SEEK_END:
+            self._position = self.size + offset
+        else:
+            raise ValueError(f"Invalid whence {whence}")
+        if self._position < 0:
+            raise OSError("Negative seek position")
+        return self._position
+
+    def read(self, size: int = -1) -> bytes:
+        end = self.size if size is None or size < 0 else self._position + size
+        end = min(end, self.size)
+        if end <= self._position:
+            return b""
+        with self._lock:
+            buffer_end = self._buffer_start + len(self._buffer)
+            if self._buffer_start <= self._position and end <= buffer_end:
+                start = self._position - self._buffer_start
+                data = self._buffer[start : start + end - self._position]
+            else:
+                data = self._read_stream(self._position, end)
+        self._position += len(data)
+        return data
+
+    def readinto(self, buffer) -> int:
+        data = self.read(len(buffer))
+        buffer[: len(data)] = data
+        return len(data)
+
+    def _read_stream(self, start: int, end: int) -> bytes:
+        if not (
+            self._stream is not None
+            and self._stream_position <= start <= self._stream_position + SKIP_SIZE
+        ):
+            self._open_stream(start)
+        self._take(start - self._stream_position)
+        return self._take(end - start)
+
+    def _open_stream(self, start: int) -> None:
+        self._close_stream()
+        request = self._client.build_request(
+            "GET",
+            self._url,
+            headers={"Range": f"bytes={start}-", "If-Range": self._validator},
+        )
+        response = self._client.send(request, stream=True)
+        if response.status_code == 200:
+            response.close()
+            raise ArchiveChanged(f"{self._url} changed while it was being read")
+        if response.status_code != 206:
+            response.close()
+            raise RangeNotSupported(f"{self._url} answered {response.status_code}")
+        self.requests += 1
+        self._stream = response
+        self._chunks = response.iter_bytes(STREAM_CHUNK_SIZE)
+        self._pending = b""
+        self._stream_position = start
+
+    def _take(self, size: int) -> bytes:
+        data = bytearray()
+        while len(data) < size:
+            if not self._pending:
+                self._pending = next(self._chunks, b"")
+                if not self._pending:
+                    self._close_stream()
+                    raise OSError(f"Range response of {self._url} ended early")
+            taken = self._pending[: size - len(data)]
+            self._pending = self._pending[len(taken) :]
+            data += taken
+        self._stream_position += size
+        return bytes(data)
+
+    def _close_stream(self) -> None:
+        if self._stream is not None:
+            self._stream.close()
+            self._stream = None
+
+    def close(self) -> None:
+        if not self.closed:
+            self._close_stream()
+            if self.requests:
+                logging.info(f"Read {self._url} in {self.requests} range requests")
+            if self._own_client:
+                self._client.close()
+        super().close()
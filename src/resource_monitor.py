@@ -0,0 +1,136 @@
+import asyncio
+import json
+import logging
+import re
+import time
+from datetime import datetime
+
+import psutil
+
+from config import APPDATA_FOLDER
+
+# Seconds between samples
+SAMPLE_INTERVAL = 2
+# Samples kept per session, older samples are thinned out past this
+MAX_SAMPLES = 1800
+# Sessions kept on disk per modpack
+SESSIONS_KEPT = 5
+
+
+class ResourceMonitor:
+    """
+    Samples memory, CPU, thread count and disk I/O of the running game
+    at a fixed rate. Long sessions are thinned out by dropping every other
+    sample, so the series stays compact however long the game runs.
+    """
+
+    def __init__(self, name: str, pid: int, command: list[str]):
+        self.name = name
+        self.pid = pid
+        self.heap_max = self._get_heap_max(command)
+        self.interval = SAMPLE_INTERVAL
+        self.series: dict[str, list] = {
+            "time": [],
+            "rss": [],
+            "cpu": [],
+            "threads": [],
+            "read": [],
+            "write": [],
+        }
+        # Peaks and averages are tracked on every sample, not the thinned series
+        self._peaks = {"rss": 0, "cpu": 0, "threads": 0}
+        self._cpu_total = 0
+        self._samples = 0
+        self._history_dir = APPDATA_FOLDER / "resource_monitor"
+
+    @staticmethod
+    def _get_heap_max(command: list[str]) -> int | None:
+        for arg in command:
+            match = re.fullmatch(r"-Xmx(\d+)([mMgG])", arg)
+            if match:
+                size = int(match.group(1))
+                return size * 1024 if match.group(2) in "gG" else size
+        return None
+
+    async def run(self) -> None:
+        """Sample the process until it exits."""
+        try:
+            process = psutil.Process(self.pid)
+            process.cpu_percent()
+        except psutil.Error as e:
+            logging.info(f"Resource monitor could not attach to {self.pid}: {e}")
+            return
+        cpu_count = psutil.cpu_count() or 1
+        start = time.monotonic()
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                with process.oneshot():
+                    rss = process.memory_info().rss
+                    cpu = process.cpu_percent() / cpu_count
+                    threads = process.num_threads()
+                    io = process.io_counters() if hasattr(process, "io_counters") else None
+            except psutil.Error:
+                return
+            self._append(
+                time=round(time.monotonic() - start),
+                rss=rss // 1024 // 1024,
+                cpu=round(cpu, 1),
+                threads=threads,
+                read=io.read_bytes // 1024 // 1024 if io else 0,
+                write=io.write_bytes // 1024 // 1024 if io else 0,
+            )
+
+    def _append(self, **sample) -> None:
+        for key, value in sample.items():
+            self.series[key].append(value)
+        for key in self._peaks:
+            self._peaks[key] = max(self._peaks[key], sample[key])
+        self._cpu_total += sample["cpu"]
+        self._samples += 1
+        if len(self.series["time"]) >= MAX_SAMPLES:
+            for key in self.series:
+                self.series[key] = self.series[key][::2]
+            self.interval *= 2
+
+    def summary(self) -> dict:
+        if not self.series["time"]:
+            return {}
+        return {
+            "duration": self.series["time"][-1],
+            "peak_rss": self._peaks["rss"],
+            "heap_max": self.heap_max,
+            "peak_cpu": self._peaks["cpu"],
+            "average_cpu": round(self._cpu_total / self._samples, 1),
+            "peak_threads": self._peaks["threads"],
+            "read": self.series["read"][-1],
+            "write": self.series["write"][-1],
+        }
+
+    def save(self) -> None:
+        if not self.series["time"]:
+            return
+        self._history_dir.mkdir(parents=True, exist_ok=True)
+        sessions = load_sessions(self.name)
+        sessions.append(
+            {
+                "time": datetime.now().isoformat(timespec="seconds"),
+                "interval": self.interval,
+                "summary": self.summary(),
+                "series": self.series,
+            }
+        )
+        with open(self._history_dir / f"{self.name}.json", "w") as f:
+            json.dump(sessions[-SESSIONS_KEPT:], f, separators=(",", ":"))
+        logging.info(f"Resource usage for {self.name}: {self.summary()}")
+
+
+def load_sessions(name: str) -> list[dict]:
+    path = APPDATA_FOLDER / "resource_monitor" / f"{name}.json"
+    if not path.exists():
+        return []
+    try:
+        with open(path, "r") as f:
+            return json.load(f)
+    except json.JSONDecodeError:
+        return []
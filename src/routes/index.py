@@ -1,23 +1,28 @@
 import os
 import logging
 import asyncio
+import random
 import subprocess
 
 import httpx
 import flet as ft
 from nava import play
 
-from minestat import MineStat, SlpProtocols
 
 from utils import Shimmer, _open_link
 from auth import account
 from modpack import modpack
+from jvm_tuning import jvm_tuner
+from game_output import GameOutput, MAX_LINE_LENGTH
+from launch_timing import LaunchTimer, launch_history
+from resource_monitor import ResourceMonitor, load_sessions
+from server_status import ServerStatus, server_status
+from dir_relocation import dir_relocation
 from authlib import authlib
 from updater import updater
 from stats import stats
 from config import (
     BASE_PATH,
-    SERVER_IP,
     SKINS_CACHE_FOLDER,
     LAUNCHER_DIRECTORY,
     CHANGELOG_URL,
@@ -25,6 +30,12 @@ from config import (
 )
 from settings import settings
 
+# Seconds between modpack index polls, growing up to the maximum while the
+# index is unchanged and up to the backoff while requests fail
+INDEX_POLL_INTERVAL = 60
+INDEX_POLL_MAX_INTERVAL = 300
+INDEX_POLL_MAX_BACKOFF = 900
+
 
 class MainPage(ft.View):
     def __init__(self, page: ft.Page):
@@ -35,12 +46,14 @@ class MainPage(ft.View):
         self._game_started = False
         self._minecraft_process = None
         self._max_progress = 0
+        self._changelog_etag = None
         self._download_callback = {  # lambda : self._progress_text.text = status,
             "setStatus": lambda status: self._set_progress_text(status),
             "setProgress": lambda progress: self._set_progress(progress),
             "setMax": lambda max: self._set_max(max),
         }
         self.build_ui()
+        server_status.subscribe(self._update_server_status)
         self._latest_tasks_inited = None
         self.page.run_task(self.init_tasks)
         self.page.on_keyboard_event = self.on_keyboard_event
@@ -55,14 +68,14 @@ class MainPage(ft.View):
             ):
                 await asyncio.sleep(60)
             break
-        self._server_status_task = self.page.run_task(self._server_status_update)
+        self._server_status_task = server_status.start()
         self._check_launcher_updates_task = self.page.run_task(
             self._check_launcher_updates
         )
         self._check_modpack_update_task = self.page.run_task(
             self._check_modpack_update_async
         )
-        # self._playtime_update_task = self.page.run_task(self._playtime_update)
+        self._playtime_update_task = self.page.run_task(self._playtime_update)
         self._latest_tasks_inited = self.page.loop.time()
 
     async def on_window_event(self, event: ft.WindowEvent):
@@ -75,7 +88,7 @@ class MainPage(ft.View):
             self._server_status_task.cancel()
             self._check_launcher_updates_task.cancel()
             self._check_modpack_update_task.cancel()
-            # self._playtime_update_task.cancel()
+            self._playtime_update_task.cancel()
             self._latest_tasks_inited = None
         elif (
             event.type == ft.WindowEventType.FOCUS
@@ -116,29 +129,41 @@ class MainPage(ft.View):
             self.page.update()
 
     async def _check_modpack_update_async(self):
-        await asyncio.to_thread(self._check_modpack_update, force=True)
+        interval = INDEX_POLL_INTERVAL
         while True:
-            await asyncio.sleep(60)
-            await asyncio.to_thread(self._check_modpack_update)
-
-    def _check_modpack_update(self, force: bool = False):
-        if self.page:
-            modpack._fetch_latest_index(force=force)
-            if modpack.is_up_to_date():
-                return
-            if modpack.installed_version == "unknown":
-                self._version_tooltip.message = (
-                    "Модпак не встановлено. Натисніть, щоб встановити його."
-                )
-                self._play_button_install()
-                self.page.update()
-                return
-
-            self._version_tooltip.message = f"Доступне оновлення: {modpack.installed_version} -> {modpack.remote_version}"
-            self._play_button_update()
-            # update changelog
-            self._get_changelog()
+            changed = await asyncio.to_thread(self._check_modpack_update)
+            if changed is None:
+                # back off while GitHub is unreachable
+                interval = min(interval * 2, INDEX_POLL_MAX_BACKOFF)
+            elif changed:
+                interval = INDEX_POLL_INTERVAL
+            else:
+                # poll less often the longer nothing changes
+                interval = min(interval * 1.5, INDEX_POLL_MAX_INTERVAL)
+            await asyncio.sleep(interval * random.uniform(0.8, 1.2))
+
+    def _check_modpack_update(self, force: bool = False) -> bool | None:
+        if not self.page:
+            return False
+        changed = modpack._fetch_latest_index(force=force)
+        if changed is None or modpack.is_up_to_date():
+            return changed
+        if modpack.installed_version == "unknown":
+            self._version_tooltip.message = (
+                "Модпак не встановлено. Натисніть, щоб встановити його."
+            )
+            self._play_button_install()
             self.page.update()
+            return changed
+
+        self._version_tooltip.message = f"Доступне оновлення: {modpack.installed_version} -> {modpack.remote_version}"
+        self._play_button_update()
+        # download the update while the player doesn't need it yet
+        modpack.stage_update()
+        # update changelog
+        self._get_changelog()
+        self.page.update()
+        return changed
 
     @staticmethod
     async def update_user_info(event: ft.RouteChangeEvent):
@@ -184,6 +209,7 @@ class MainPage(ft.View):
 
     def kill_app(self):
         logging.info("Trying to exit program via asyncio")
+        settings.flush()
         to_cancel = asyncio.all_tasks(self.page.loop)
         if not to_cancel:
             return
@@ -192,11 +218,24 @@ class MainPage(ft.View):
             task.cancel()
 
     def _get_changelog(self):
-        changelog_text = httpx.get(
-            CHANGELOG_URL,
-            timeout=5,
-            follow_redirects=True,
-        ).text
+        headers = {}
+        if self._changelog_etag:
+            headers["If-None-Match"] = self._changelog_etag
+        try:
+            response = httpx.get(
+                CHANGELOG_URL,
+                headers=headers,
+                timeout=5,
+                follow_redirects=True,
+            )
+            if response.status_code == 304:
+                return
+            response.raise_for_status()
+        except httpx.HTTPError as e:
+            logging.info(f"Error fetching changelog: {e}")
+            return
+        self._changelog_etag = response.headers.get("etag")
+        changelog_text = response.text
         self._changelog = ft.Markdown(
             value=changelog_text,
             auto_follow_links=True,
@@ -213,6 +252,7 @@ class MainPage(ft.View):
             logging.error(f"Selected modpack {selected_modpack} not found.")
             return
         modpack.set_modpack(selected_modpack)
+        self._resource_usage_button.visible = bool(load_sessions(modpack.name))
         # self._check_modpack_update(force=True)
         self.page.update()
 
@@ -343,6 +383,13 @@ class MainPage(ft.View):
             tooltip="Відкрити папку з грою",
             on_click=lambda e: _open_link(f"file://{settings.minecraft_directory}"),
         )
+        self._resource_usage_button = ft.FloatingActionButton(
+            icon=ft.Icons.MONITOR_HEART,
+            bgcolor=ft.Colors.SECONDARY_CONTAINER,
+            tooltip="Ресурси останньої сесії",
+            on_click=lambda e: self._show_resource_usage(),
+            visible=bool(load_sessions(modpack.name)),
+        )
         self._selected_modpack = ft.Dropdown(
             options=[ft.dropdown.Option(name) for name in modpack._remote_modpacks],
             on_change=self._change_modpack,
@@ -357,6 +404,7 @@ class MainPage(ft.View):
                     self._play_button,
                     self._check_game_button,
                     self._open_game_folder_button,
+                    self._resource_usage_button,
                     self._selected_modpack,
                 ],
                 alignment=ft.MainAxisAlignment.END,
@@ -459,7 +507,7 @@ class MainPage(ft.View):
                     ),
                     self._server_status,
                     ft.Container(width=292),
-                    # self._playtime,
+                    self._playtime,
                 ],
                 expand=False,
             ),
@@ -483,47 +531,41 @@ class MainPage(ft.View):
         self.page.run_thread(self._get_changelog)
         self.page.update()
 
-    async def _server_status_update(self):
-        while True:
-            try:
-                await asyncio.to_thread(self._update_server_status)
-                await asyncio.sleep(10)
-            except Exception as e:
-                logging.info(f"Error updating server status: {e}")
-                await asyncio.sleep(15)
-
     async def _playtime_update(self):
+        # fill in last known values while the first request is in flight
+        self._show_playtime(stats.get_cached_player_stats(self._player_uuid()))
         while True:
             try:
                 if self.page is None:
                     return
-                player_stats = await stats.get_player_stats(
-                    account.user["user"]["players"][0]["uuid"]
-                )
-                if player_stats is None:
-                    self._playtime_text.value = "Час на сервері: -"
-                    self._latest_online_text.value = "Останній вхід: -"
-                    await asyncio.sleep(60)
-                    continue
-                player_stats = player_stats.get("info", {})
-                playtime = player_stats.get("playtime", "0")
-                last_seen = player_stats.get("last_seen", "Ніколи")
-                if player_stats is not None:
-                    self._playtime_text.value = f"Час на сервері: {playtime}"
-                    self._latest_online_text.value = f"Останній вхід: {last_seen}"
+                uuid = self._player_uuid()
+                if uuid is not None:
+                    self._show_playtime(await stats.get_player_stats(uuid))
             except Exception as e:
                 logging.error(f"Error updating playtime: {e}")
             await asyncio.sleep(60)  # Update every minute
 
-    def _update_server_status(self):
+    @staticmethod
+    def _player_uuid() -> str | None:
+        players = account.user.get("user", {}).get("players") or [{}]
+        return players[0].get("uuid")
+
+    def _show_playtime(self, player_stats: dict | None):
         if self.page is None:
             return
-        try:
-            server = MineStat(
-                address=SERVER_IP, port=25565, query_protocol=SlpProtocols.LEGACY
-            )
-        except Exception as e:
-            logging.warning(f"Failed to fetch server status: {e}")
+        if player_stats is None:
+            self._playtime_text.value = "Час на сервері: -"
+            self._latest_online_text.value = "Останній вхід: -"
+        else:
+            player_stats = player_stats.get("info", {})
+            playtime = player_stats.get("playtime", "0")
+            last_seen = player_stats.get("last_seen", "Ніколи")
+            self._playtime_text.value = f"Час на сервері: {playtime}"
+            self._latest_online_text.value = f"Останній вхід: {last_seen}"
+        self.page.update()
+
+    def _update_server_status(self, server: ServerStatus):
+        if self.page is None:
             return
 
         if server.online:
@@ -533,7 +575,7 @@ class MainPage(ft.View):
             ].value = f"Сервер онлайн ({server.latency} мс)"
             self._server_status.controls[1].controls[
                 2
-            ].value = f"{server.current_players}/{server.max_players}"
+            ].value = f"{server.players_online}/{server.players_max}"
         else:
             self._server_status.controls[0].controls[0].color = ft.Colors.RED
             self._server_status.controls[0].controls[1].value = "Сервер офлайн"
@@ -551,6 +593,15 @@ class MainPage(ft.View):
             logging.info("Minecraft is already running.")
             return
 
+        if dir_relocation.active:
+            logging.info("Minecraft directory is being moved.")
+            self._set_progress_text("Зачекайте, тека Minecraft переміщується")
+            self._progress_text.visible = True
+            self._play_button_enable()
+            self._check_game_button_enable()
+            self.page.update()
+            return
+
         logging.info("Checking game...")
         # check if game is installed
         installed_versions = modpack.get_installed_versions()
@@ -577,20 +628,20 @@ class MainPage(ft.View):
             self._launch_minecraft()
 
     def _launch_minecraft(self):
+        # the game reads options.txt on start
+        settings.flush()
+        self._launch_timer = LaunchTimer(modpack.name, modpack.installed_version)
         minecraft_command = modpack.get_minecraft_command(
             account.username, account.uuid, account.access_token
         )
         if self._check_minecraft_running():
             logging.info("Minecraft is already running.")
             return
-        self._minecraft_process = subprocess.Popen(
-            minecraft_command,
-            cwd=modpack.modpack_path,
-            stdout=subprocess.PIPE,
-            stderr=subprocess.PIPE,
-            creationflags=subprocess.CREATE_NO_WINDOW if SYSTEM_OS == "Windows" else 0,
-            start_new_session=True,
-        )
+        # the pipes are read by the page loop, so the process has to be created there
+        asyncio.run_coroutine_threadsafe(
+            self._start_minecraft(minecraft_command), self.page.loop
+        ).result()
+        self._launch_timer.mark("process_started")
         self.page.run_task(self._check_minecraft)
         self._play_button_stop()
         self._check_game_button_disable()
@@ -600,6 +651,117 @@ class MainPage(ft.View):
             self.kill_app()
         self.page.update()
 
+    async def _start_minecraft(self, minecraft_command: list[str]):
+        self._minecraft_process = await asyncio.create_subprocess_exec(
+            *minecraft_command,
+            cwd=modpack.modpack_path,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.PIPE,
+            limit=MAX_LINE_LENGTH,
+            creationflags=subprocess.CREATE_NO_WINDOW if SYSTEM_OS == "Windows" else 0,
+            start_new_session=True,
+        )
+        account.game_process = self._minecraft_process
+        self._game_output = GameOutput(modpack.name)
+        self._game_output.add_listener(self._on_game_output)
+        self._resource_monitor = ResourceMonitor(
+            modpack.name, self._minecraft_process.pid, minecraft_command
+        )
+
+    def _on_game_output(self, line: str):
+        if self._launch_timer.main_menu_reached:
+            return
+        self._launch_timer.on_line(line)
+        if not self._launch_timer.main_menu_reached:
+            return
+        launch_history.add(self._launch_timer)
+        status = f"Гра запустилась за {self._launch_timer.phases['main_menu']:.1f} с"
+        difference = launch_history.compare_to_previous_version(modpack.name)
+        if difference is not None and abs(difference) >= 1:
+            status += f" ({difference:+.1f} с після оновлення)"
+        self._progress_text.value = status
+        self._progress_text.visible = True
+        if self.page:
+            self.page.update()
+
+    def _resource_chart(
+        self, series: dict, key: str, max_y: float, color: str, unit: str
+    ) -> ft.LineChart:
+        return ft.LineChart(
+            data_series=[
+                ft.LineChartData(
+                    data_points=[
+                        ft.LineChartDataPoint(t / 60, value)
+                        for t, value in zip(series["time"], series[key])
+                    ],
+                    color=color,
+                    stroke_width=2,
+                    curved=True,
+                )
+            ],
+            min_y=0,
+            max_y=max_y,
+            left_axis=ft.ChartAxis(labels_size=48, title=ft.Text(unit, size=12)),
+            bottom_axis=ft.ChartAxis(labels_size=24, title=ft.Text("хв", size=12)),
+            horizontal_grid_lines=ft.ChartGridLines(
+                color=ft.Colors.OUTLINE_VARIANT, width=1
+            ),
+            height=160,
+        )
+
+    def _show_resource_usage(self):
+        sessions = load_sessions(modpack.name)
+        if not sessions:
+            return
+        session = sessions[-1]
+        series = session["series"]
+        summary = session["summary"]
+        heap_max = summary.get("heap_max")
+        rss_text = f"Пік пам'яті: {summary['peak_rss']} МБ"
+        if heap_max:
+            rss_text += f" (виділено під heap: {heap_max} МБ)"
+        resource_dialog = ft.AlertDialog(
+            title=ft.Text(f"Ресурси гри ({session['time'].replace('T', ' ')})"),
+            content=ft.Container(
+                content=ft.Column(
+                    [
+                        ft.Text(rss_text, size=14),
+                        self._resource_chart(
+                            series,
+                            "rss",
+                            max(summary["peak_rss"], heap_max or 0) * 1.1,
+                            ft.Colors.PRIMARY,
+                            "МБ",
+                        ),
+                        ft.Text(
+                            f"Процесор: пік {summary['peak_cpu']}%, "
+                            f"в середньому {summary['average_cpu']}%",
+                            size=14,
+                        ),
+                        self._resource_chart(
+                            series, "cpu", 100, ft.Colors.TERTIARY, "%"
+                        ),
+                        ft.Text(
+                            f"Потоків: до {summary['peak_threads']}, "
+                            f"прочитано з диску: {summary['read']} МБ, "
+                            f"записано: {summary['write']} МБ",
+                            size=14,
+                        ),
+                    ],
+                    tight=True,
+                    scroll=ft.ScrollMode.AUTO,
+                ),
+                width=600,
+            ),
+            actions=[
+                ft.TextButton(
+                    "Закрити",
+                    on_click=lambda e: self.page.close(resource_dialog),
+                )
+            ],
+        )
+        self.page.open(resource_dialog)
+
     def _install_minecraft(self):
         logging.info("Downloading game...")
 
@@ -779,66 +941,59 @@ class MainPage(ft.View):
     def _check_minecraft_running(self):
         return (
             self._minecraft_process is not None
-            and self._minecraft_process.poll() is None
+            and self._minecraft_process.returncode is None
         )
 
-    # if minecraft is not running, enable play button, check in loop
+    # stream the game output until minecraft exits, then enable play button
     async def _check_minecraft(self):
-        self.minecraft_stdout = []
-        self.minecraft_stderr = []
-        while True:
-            self.minecraft_stdout += self._minecraft_process.stdout.readlines()
-            self.minecraft_stderr += self._minecraft_process.stderr.readlines()
-
-            if not self._check_minecraft_running():
-                if self._minecraft_process.returncode == 1:
-                    alert_dialog = ft.AlertDialog(
-                        title=ft.Row(
-                            [
-                                ft.Icon(
-                                    ft.Icons.ERROR, color=ft.Colors.ON_ERROR_CONTAINER
-                                ),
-                                ft.Text("Помилка запуску Minecraft"),
-                            ],
-                            alignment=ft.MainAxisAlignment.START,
-                        ),
-                        # add latest stderr content (last 100 lines)
-                        # add scrollable text area
-                        content=ft.Container(
-                            padding=ft.Padding(8, 8, 8, 8),
-                            content=ft.Text(
-                                "".join(
-                                    [
-                                        line.decode("utf-8")
-                                        for line in self.minecraft_stderr[-100:]
-                                    ]
-                                ),
-                                size=12,
-                                text_align=ft.TextAlign.LEFT,
-                                selectable=True,
-                            ),
-                            width=600,
-                            border_radius=0,
-                            bgcolor=ft.Colors.SECONDARY_CONTAINER,
-                            expand=True,
+        monitor_task = asyncio.create_task(self._resource_monitor.run())
+        await self._game_output.consume(self._minecraft_process)
+        await self._minecraft_process.wait()
+        await monitor_task
+        await asyncio.to_thread(self._resource_monitor.save)
+        await asyncio.to_thread(jvm_tuner.analyze_session, modpack.name)
+        self._resource_usage_button.visible = bool(load_sessions(modpack.name))
+        if self._minecraft_process.returncode == 1:
+            alert_dialog = ft.AlertDialog(
+                title=ft.Row(
+                    [
+                        ft.Icon(
+                            ft.Icons.ERROR, color=ft.Colors.ON_ERROR_CONTAINER
                         ),
-                        actions=[
-                            ft.TextButton(
-                                "Закрити",
-                                on_click=lambda e: self.page.close(alert_dialog),
-                            )
-                        ],
-                        content_padding=ft.Padding(16, 16, 16, 16),
-                        title_padding=ft.Padding(16, 16, 16, 0),
-                        action_button_padding=ft.Padding(0, 0, 0, 0),
+                        ft.Text("Помилка запуску Minecraft"),
+                    ],
+                    alignment=ft.MainAxisAlignment.START,
+                ),
+                # add latest stderr content (last 100 lines)
+                # add scrollable text area
+                content=ft.Container(
+                    padding=ft.Padding(8, 8, 8, 8),
+                    content=ft.Text(
+                        "".join(list(self._game_output.stderr)[-100:]),
+                        size=12,
+                        text_align=ft.TextAlign.LEFT,
+                        selectable=True,
+                    ),
+                    width=600,
+                    border_radius=0,
+                    bgcolor=ft.Colors.SECONDARY_CONTAINER,
+                    expand=True,
+                ),
+                actions=[
+                    ft.TextButton(
+                        "Закрити",
+                        on_click=lambda e: self.page.close(alert_dialog),
                     )
-                    self.page.open(alert_dialog)
-                self._play_button_enable()
-                self._check_game_button_enable()
-                self.page.window.to_front()
-                self.update()
-                break
-            await asyncio.sleep(2)
+                ],
+                content_padding=ft.Padding(16, 16, 16, 16),
+                title_padding=ft.Padding(16, 16, 16, 0),
+                action_button_padding=ft.Padding(0, 0, 0, 0),
+            )
+            self.page.open(alert_dialog)
+        self._play_button_enable()
+        self._check_game_button_enable()
+        self.page.window.to_front()
+        self.update()
 
     def _set_max(self, max: int):
         self._max_progress = max
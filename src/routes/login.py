@@ -68,11 +68,11 @@ class LoginPage(ft.View):
         self.password.value = ""
         self.page.go("/register")
 
-    def login(self, e):
+    async def login(self, e):
         username = self.username.value.strip()
         password = self.password.value.strip()
         if username and password:
-            response = account.login(username, password)
+            response = await account.login(username, password)
             if response.status_code != 200:
                 self._status_bar = ft.SnackBar(
                     ft.Text(response.json()["message"]),
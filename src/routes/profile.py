@@ -32,7 +32,7 @@ class ProfilePage(ft.View):
             title=ft.Text("Підтвердження"),
             content=ft.Text("Ви впевнені, що хочете вийти?"),
             actions=[
-                ft.TextButton("Так", on_click=lambda e: self.logout()),
+                ft.TextButton("Так", on_click=self.logout),
                 ft.TextButton("Ні", on_click=self.close_alert),
             ],
         )
@@ -278,13 +278,15 @@ class ProfilePage(ft.View):
         self._edit_nickname_icon.update()
         self._edit_nickname_title.focus()
 
-    def _save_nickname(self, e: ft.ControlEvent):
+    async def _save_nickname(self, e: ft.ControlEvent):
         if account.is_valid_nickname(self._edit_nickname_title.value):
-            resp = account.update_player({"name": self._edit_nickname_title.value})
+            resp = await account.update_player(
+                {"name": self._edit_nickname_title.value}
+            )
             resp_json = resp.json()
             if resp.status_code == 200:
                 if resp_json["name"] == self._edit_nickname_title.value:
-                    account.get_user()
+                    await account.get_user()
                     self._edit_nickname_title.disabled = True
                     self._edit_nickname_icon.icon = ft.Icons.EDIT
                     self._edit_nickname_icon.tooltip = "Редагувати"
@@ -317,7 +319,7 @@ class ProfilePage(ft.View):
             with open(file_path, "rb") as file:
                 img = base64.b64encode(file.read()).decode("utf-8")
             # update skin
-            resp = account.update_player({"skinBase64": img})
+            resp = await account.update_player({"skinBase64": img})
             resp_json = resp.json()
             if resp.status_code == 200:
                 if resp_json["skinUrl"]:
@@ -339,7 +341,7 @@ class ProfilePage(ft.View):
             with open(file_path, "rb") as file:
                 img = base64.b64encode(file.read()).decode("utf-8")
             # update cape
-            resp = account.update_player({"capeBase64": img})
+            resp = await account.update_player({"capeBase64": img})
             resp_json = resp.json()
             if resp.status_code == 200:
                 if resp_json["capeUrl"]:
@@ -355,7 +357,7 @@ class ProfilePage(ft.View):
         return
 
     async def on_delete_skin(self, e):
-        resp = account.update_player({"deleteSkin": True})
+        resp = await account.update_player({"deleteSkin": True})
         resp_json = resp.json()
         if resp.status_code == 200:
             if resp_json["skinUrl"] is None:
@@ -370,7 +372,7 @@ class ProfilePage(ft.View):
         self.page.open(self._snack_bar)
 
     async def on_delete_cape(self, e):
-        resp = account.update_player({"deleteCape": True})
+        resp = await account.update_player({"deleteCape": True})
         resp_json = resp.json()
         if resp.status_code == 200:
             if resp_json["capeUrl"] is None:
@@ -384,12 +386,12 @@ class ProfilePage(ft.View):
             self._snack_bar.bgcolor = ft.Colors.RED_400
         self.page.open(self._snack_bar)
 
-    def on_skin_type_change(self, e: ft.ControlEvent):
-        resp = account.update_player({"skinModel": e.data})
+    async def on_skin_type_change(self, e: ft.ControlEvent):
+        resp = await account.update_player({"skinModel": e.data})
         resp_json = resp.json()
         if resp.status_code == 200:
             if resp_json["skinModel"] == e.data:
-                account.get_user()
+                await account.get_user()
                 account.update_skin = True
                 self.update_skin()
                 self._snack_bar.content = ft.Text("Тип скіна успішно змінено!")
@@ -399,7 +401,7 @@ class ProfilePage(ft.View):
             self._snack_bar.bgcolor = ft.Colors.RED_400
         self.page.open(self._snack_bar)
 
-    def on_change_password(self, e):
+    async def on_change_password(self, e):
         new_password = self._new_password.value.strip()
         confirm_password = self._confirm_password.value.strip()
         if not all([new_password, confirm_password]):
@@ -414,7 +416,7 @@ class ProfilePage(ft.View):
             self._snack_bar.content = ft.Text("Паролі не співпадають!")
             self._snack_bar.bgcolor = ft.Colors.RED_400
         else:
-            resp = account.update_user({"password": new_password})
+            resp = await account.update_user({"password": new_password})
             resp_json = resp.json()
             if resp.status_code == 200:
                 self._snack_bar.content = ft.Text("Пароль успішно змінено!")
@@ -433,8 +435,8 @@ class ProfilePage(ft.View):
         self._confirm_password.value = ""
         self.page.go("/")
 
-    def logout(self):
-        account.logout()
+    async def logout(self, e):
+        await account.logout()
         self.page.go("/login")
 
     def open_alert(self, e):
@@ -86,7 +86,7 @@ class RegisterPage(ft.View):
             )
         )
 
-    def register(self, e: ft.ControlEvent):
+    async def register(self, e: ft.ControlEvent):
         if self.rules_agreement.value is False:
             snack_bar = ft.SnackBar(
                 ft.Text("Ви повинні погодитись з правилами!"),
@@ -121,7 +121,7 @@ class RegisterPage(ft.View):
                 ft.Text("Паролі не співпадають!"), bgcolor=ft.Colors.ERROR, open=True
             )
         else:
-            resp = account.register(username, password)
+            resp = await account.register(username, password)
             if resp is True:
                 snack_bar = ft.SnackBar(
                     ft.Text("Ви успішно зареєструвались!"),
@@ -1,8 +1,8 @@
 import asyncio
 import os
-import shutil
 import subprocess
 import flet as ft
+import minecraft_launcher_lib as mcl
 
 from config import (
     APPDATA_FOLDER,
@@ -12,6 +12,9 @@ from config import (
     LAUNCHER_COLORS,
     LAUNCHER_THEMES,
 )
+from dir_relocation import dir_relocation
+from jvm_tuning import jvm_tuner
+from trash import trash
 from settings import settings
 from utils import Shimmer, setup_theme_settings
 
@@ -32,20 +35,15 @@ class SettingsPage(ft.View):
                 ft.TextButton("Ні", on_click=self._dialog_close),
             ],
         )
-        self._loading_indicator = ft.Container(
-            ft.ProgressRing(
-                width=64, height=64, stroke_width=8, visible=True, expand=True
-            ),
-            alignment=ft.Alignment(0, 0),
-            blur=2,
-            disabled=True,
-            visible=False,
-        )
         self.page.overlay.append(self._dir_picker)
         self.page.overlay.append(self._snack_bar)
         self.page.overlay.append(self._dialog)
-        self.page.overlay.append(self._loading_indicator)
         self.build_ui()
+        # resume deleting and moving interrupted by closing the launcher
+        trash.resume(settings.minecraft_directory)
+        pending_relocation = dir_relocation.pending()
+        if pending_relocation:
+            self.page.run_thread(self._relocate_minecraft_dir, *pending_relocation)
         # self.page.run_thread(self._meme)
 
     def build_ui(self):
@@ -125,6 +123,15 @@ class SettingsPage(ft.View):
                 ],
             ),
         )
+        self._auto_tune = ft.ListTile(
+            title=ft.Text("Автоналаштування пам'яті та GC:"),
+            subtitle=ft.Text("", size=12),
+            trailing=ft.Checkbox(value=settings.game.auto_tune),
+        )
+        self._use_system_java = ft.ListTile(
+            title=ft.Text("Використовувати встановлену Java:"),
+            trailing=ft.Checkbox(value=settings.game.use_system_java),
+        )
         self._java_args_field = ft.TextField(
             value=" ".join(settings.game.java_args),
             multiline=True,
@@ -149,6 +156,7 @@ class SettingsPage(ft.View):
                             title=ft.Text("Максимальний обсяг виділеної пам'яті:"),
                             trailing=self._max_ram_field,
                         ),
+                        self._auto_tune,
                     ],
                 ),
             ),
@@ -162,6 +170,7 @@ class SettingsPage(ft.View):
                     controls=[
                         ft.Text("Аргументи Java", size=16),
                         ft.Divider(height=4),
+                        self._use_system_java,
                         self._java_args_field,
                     ],
                 ),
@@ -357,6 +366,9 @@ class SettingsPage(ft.View):
             ),
             read_only=True,
         )
+        self._relocation_text = ft.Text("", size=12, visible=False)
+        self._relocation_progress = ft.ProgressBar(value=0, visible=False)
+        self._relocation_max = 0
         self._minecraft_dir_card = ft.Card(
             expand=True,
             content=ft.Container(
@@ -369,6 +381,8 @@ class SettingsPage(ft.View):
                         ft.ListTile(
                             trailing=self._minecraft_dir_field,
                         ),
+                        self._relocation_text,
+                        self._relocation_progress,
                         ft.ListTile(
                             leading=ft.Row(
                                 spacing=8,
@@ -692,34 +706,62 @@ class SettingsPage(ft.View):
     def _pick_dir_result(self, e: ft.FilePickerResultEvent):
         if not e.path or e.path == settings.minecraft_directory:
             return
-        try:
-            self._loading_indicator.visible = True
-            self._loading_indicator.disabled = False
-            self.page.update()
+        self._dir_picker.path = None
+        if dir_relocation.active:
+            self._show_snack_bar("Тека вже переміщується", ft.Colors.RED_400)
+            return
+        self.page.run_thread(
+            self._relocate_minecraft_dir, str(settings.minecraft_directory), e.path
+        )
 
-            if not os.path.exists(e.path):
-                os.makedirs(e.path)
-            for filename in os.listdir(settings.minecraft_directory):
-                src = os.path.join(settings.minecraft_directory, filename)
-                dst = os.path.join(e.path, filename)
-                if os.path.exists(dst):
-                    if os.path.isfile(dst) or os.path.islink(dst):
-                        os.unlink(dst)
-                    elif os.path.isdir(dst):
-                        shutil.rmtree(dst)
-                shutil.move(src, e.path)
-            settings.minecraft_directory = e.path
-            self._minecraft_dir_field.value = e.path
-            settings.save()
-            self._show_snack_bar("Теку успішно переміщено!", ft.Colors.GREEN_400)
+    def _relocate_minecraft_dir(self, source: str, destination: str):
+        self._relocation_text.value = "Переміщення теки Minecraft..."
+        self._relocation_text.visible = True
+        self._relocation_progress.value = None
+        self._relocation_progress.visible = True
+        self.page.update()
+        try:
+            dir_relocation.relocate(
+                source,
+                destination,
+                {
+                    "setStatus": self._set_relocation_status,
+                    "setProgress": self._set_relocation_progress,
+                    "setMax": self._set_relocation_max,
+                },
+            )
+            self._minecraft_dir_field.value = destination
+            self._snack_bar.content = ft.Text("Теку успішно переміщено!")
+            self._snack_bar.bgcolor = ft.Colors.GREEN_400
         except Exception as ex:
-            self._show_snack_bar(f"Помилка: {ex}", ft.Colors.RED_400)
+            self._snack_bar.content = ft.Text(f"Помилка: {ex}")
+            self._snack_bar.bgcolor = ft.Colors.RED_400
         finally:
-            self._dir_picker.path = None
-            self._loading_indicator.visible = False
-            self._loading_indicator.disabled = True
-            self._dir_picker.update()
-            self.update()
+            self._snack_bar.open = True
+            self._relocation_text.visible = False
+            self._relocation_progress.visible = False
+            self.page.update()
+
+    def _set_relocation_status(self, status: str):
+        self._relocation_text.value = status
+        self._relocation_progress.value = None
+        self.page.update()
+
+    def _set_relocation_max(self, value: int):
+        self._relocation_max = value
+
+    def _set_relocation_progress(self, value: int):
+        if not self._relocation_max:
+            return
+        progress = value / self._relocation_max
+        # avoid flooding the UI with updates for every small file
+        if (
+            self._relocation_progress.value is None
+            or progress - self._relocation_progress.value >= 0.01
+            or progress == 1
+        ):
+            self._relocation_progress.value = progress
+            self.page.update()
 
     def _clear_minecraft_dir(self, event):
         self._dialog.open = True
@@ -727,24 +769,13 @@ class SettingsPage(ft.View):
 
     def _clear_minecraft_dir_confirmed(self, event):
         self._dialog.open = False
-        self._loading_indicator.visible = True
-        self._loading_indicator.disabled = False
         self.update()
-        mc_dir = settings.minecraft_directory
         try:
-            for filename in os.listdir(mc_dir):
-                path = os.path.join(mc_dir, filename)
-                if os.path.isfile(path) or os.path.islink(path):
-                    os.unlink(path)
-                elif os.path.isdir(path):
-                    shutil.rmtree(path)
+            # files are deleted in the background after being moved away
+            trash.clear(settings.minecraft_directory)
             self._show_snack_bar("Теку очищено!", ft.Colors.GREEN_400)
         except Exception as e:
             self._show_snack_bar(f"Помилка: {e}", ft.Colors.RED_400)
-        finally:
-            self._loading_indicator.visible = False
-            self._loading_indicator.disabled = True
-            self.update()
 
     def _open_minecraft_dir(self, event):
         mc_dir = settings.minecraft_directory
@@ -854,12 +885,24 @@ class SettingsPage(ft.View):
         self._minimize_launcher.trailing.value = settings.minimize_launcher
         self._quit_launcher.trailing.value = settings.close_launcher
         self._minecraft_dir_field.value = settings.minecraft_directory
+        self._auto_tune.trailing.value = settings.game.auto_tune
+        self._use_system_java.trailing.value = settings.game.use_system_java
+        recommendation = jvm_tuner.get_recommendation(settings.modpack_name)
+        self._auto_tune.subtitle.value = (
+            f"Рекомендовано: {recommendation['max_use_ram']} МБ, "
+            f"{recommendation['gc'].capitalize()} GC"
+            if recommendation
+            else ""
+        )
 
     def go_index(self, event):
         settings.game.min_use_ram = int(self._min_ram_field.value)
         settings.game.max_use_ram = int(self._max_ram_field.value)
         settings.game.java_args = self._java_args_field.value.split(" ")
         settings.game.fullscreen = self._is_fullscreen_game.trailing.value
+        settings.game.auto_tune = self._auto_tune.trailing.value
+        settings.game.use_system_java = self._use_system_java.trailing.value
+        mcl.runtime.set_use_system_java(settings.game.use_system_java)
         settings.game.window_width = int(self._game_window_width.trailing.value)
         settings.game.window_height = int(self._game_window_eight.trailing.value)
         settings.minimize_launcher = self._minimize_launcher.trailing.value
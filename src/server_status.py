@@ -0,0 +1,267 @@
+import asyncio
+import json
+import logging
+import random
+import struct
+import time
+from dataclasses import dataclass
+from typing import Callable
+
+from config import SERVER_IP
+
+SERVER_PORT = 25565
+# Seconds to wait for each network step of a ping
+PING_TIMEOUT = 5
+# Seconds between polls while the server answers
+POLL_INTERVAL = 10
+# Upper bound for the offline backoff
+MAX_BACKOFF = 300
+# Protocol version sent in the handshake, -1 asks for the server's own
+HANDSHAKE_PROTOCOL = -1
+
+
+class ProtocolError(Exception):
+    pass
+
+
+class ServerUnreachable(Exception):
+    pass
+
+
+@dataclass
+class ServerStatus:
+    online: bool
+    latency: int | None = None
+    players_online: int | None = None
+    players_max: int | None = None
+    version: str | None = None
+    motd: str | None = None
+
+
+def _pack_varint(value: int) -> bytes:
+    value &= 0xFFFFFFFF
+    data = b""
+    while True:
+        byte = value & 0x7F
+        value >>= 7
+        if value:
+            data += bytes([byte | 0x80])
+        else:
+            return data + bytes([byte])
+
+
+def _pack_string(value: str) -> bytes:
+    data = value.encode("utf-8")
+    return _pack_varint(len(data)) + data
+
+
+def _pack_packet(packet_id: int, payload: bytes = b"") -> bytes:
+    data = _pack_varint(packet_id) + payload
+    return _pack_varint(len(data)) + data
+
+
+async def _read_varint(reader: asyncio.StreamReader) -> int:
+    value = 0
+    for i in range(5):
+        byte = (await reader.readexactly(1))[0]
+        value |= (byte & 0x7F) << (7 * i)
+        if not byte & 0x80:
+            return value
+    raise ProtocolError("VarInt is too big")
+
+
+async def _read_packet(reader: asyncio.StreamReader) -> tuple[int, bytes]:
+    length = await _read_varint(reader)
+    data = await reader.readexactly(length)
+    packet_id = data[0]
+    return packet_id, data[1:]
+
+
+def _unpack_string(data: bytes) -> str:
+    value, shift, position = 0, 0, 0
+    while True:
+        byte = data[position]
+        position += 1
+        value |= (byte & 0x7F) << shift
+        shift += 7
+        if not byte & 0x80:
+            break
+    return data[position : position + value].decode("utf-8")
+
+
+def _motd_text(description) -> str:
+    if isinstance(description, str):
+        return description
+    if isinstance(description, dict):
+        return description.get("text", "") + "".join(
+            _motd_text(extra) for extra in description.get("extra", [])
+        )
+    return ""
+
+
+async def _connect(
+    host: str, port: int
+) -> tuple[asyncio.StreamReader, asyncio.StreamWriter]:
+    try:
+        return await asyncio.wait_for(
+            asyncio.open_connection(host, port), PING_TIMEOUT
+        )
+    except (OSError, asyncio.TimeoutError) as e:
+        raise ServerUnreachable(e) from e
+
+
+async def _ping_modern(host: str, port: int) -> ServerStatus:
+    reader, writer = await _connect(host, port)
+    try:
+        handshake = (
+            _pack_varint(HANDSHAKE_PROTOCOL)
+            + _pack_string(host)
+            + struct.pack(">H", port)
+            + _pack_varint(1)
+        )
+        writer.write(_pack_packet(0x00, handshake) + _pack_packet(0x00))
+        await writer.drain()
+        packet_id, data = await asyncio.wait_for(_read_packet(reader), PING_TIMEOUT)
+        if packet_id != 0x00:
+            raise ProtocolError(f"Unexpected status packet {packet_id}")
+        status = json.loads(_unpack_string(data))
+
+        start = time.perf_counter()
+        writer.write(_pack_packet(0x01, struct.pack(">q", int(start))))
+        await writer.drain()
+        try:
+            await asyncio.wait_for(_read_packet(reader), PING_TIMEOUT)
+        except (asyncio.IncompleteReadError, asyncio.TimeoutError):
+            # Some proxies close the connection instead of answering the ping
+            pass
+        latency = round((time.perf_counter() - start) * 1000)
+    finally:
+        writer.close()
+
+    players = status.get("players", {})
+    return ServerStatus(
+        online=True,
+        latency=latency,
+        players_online=players.get("online"),
+        players_max=players.get("max"),
+        version=status.get("version", {}).get("name"),
+        motd=_motd_text(status.get("description")),
+    )
+
+
+async def _ping_legacy(host: str, port: int) -> ServerStatus:
+    start = time.perf_counter()
+    reader, writer = await _connect(host, port)
+    try:
+        writer.write(b"\xfe\x01")
+        await writer.drain()
+        header = await asyncio.wait_for(reader.readexactly(3), PING_TIMEOUT)
+        if header[0] != 0xFF:
+            raise ProtocolError("Unexpected legacy response")
+        length = struct.unpack(">H", header[1:])[0]
+        data = await asyncio.wait_for(reader.readexactly(length * 2), PING_TIMEOUT)
+        latency = round((time.perf_counter() - start) * 1000)
+    finally:
+        writer.close()
+
+    fields = data.decode("utf-16-be").split("\x00")
+    if fields[0] == "§1":
+        # 1.4+ format: §1, protocol, version, motd, online, max
+        version, motd, online, maximum = fields[2:6]
+    else:
+        # Beta 1.8 - 1.3 format: motd§online§max
+        motd, online, maximum = fields[0].rsplit("§", 2)
+        version = None
+    return ServerStatus(
+        online=True,
+        latency=latency,
+        players_online=int(online),
+        players_max=int(maximum),
+        version=version,
+        motd=motd,
+    )
+
+
+async def ping(host: str, port: int = SERVER_PORT) -> ServerStatus:
+    """
+    Ping a server with the modern Server List Ping, falling back to the
+    legacy one for servers that accept the connection but don't answer it.
+    """
+    try:
+        return await _ping_modern(host, port)
+    except ServerUnreachable as e:
+        logging.info(f"Server {host}:{port} is unreachable: {e}")
+        return ServerStatus(online=False)
+    except (
+        OSError,
+        asyncio.TimeoutError,
+        asyncio.IncompleteReadError,
+        ProtocolError,
+        ValueError,
+        IndexError,
+    ) as e:
+        logging.info(f"Modern ping of {host}:{port} failed, trying legacy: {e!r}")
+    try:
+        return await _ping_legacy(host, port)
+    except (
+        ServerUnreachable,
+        OSError,
+        asyncio.TimeoutError,
+        asyncio.IncompleteReadError,
+        ProtocolError,
+        ValueError,
+    ) as e:
+        logging.info(f"Legacy ping of {host}:{port} failed: {e}")
+        return ServerStatus(online=False)
+
+
+class ServerStatusPoller:
+    """
+    Polls one server and shares the latest status with every subscriber.
+    While the server is offline the interval grows exponentially.
+    """
+
+    def __init__(self, host: str, port: int = SERVER_PORT):
+        self.host = host
+        self.port = port
+        self.status: ServerStatus | None = None
+        self._subscribers: list[Callable[[ServerStatus], None]] = []
+        self._task: asyncio.Task | None = None
+
+    def subscribe(self, callback: Callable[[ServerStatus], None]) -> None:
+        self._subscribers.append(callback)
+        if self.status is not None:
+            callback(self.status)
+
+    def unsubscribe(self, callback: Callable[[ServerStatus], None]) -> None:
+        if callback in self._subscribers:
+            self._subscribers.remove(callback)
+
+    def start(self) -> asyncio.Task:
+        """Start polling on the running loop, or return the running poll."""
+        if self._task is None or self._task.done():
+            self._task = asyncio.get_running_loop().create_task(self._run())
+        return self._task
+
+    def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+
+    async def _run(self) -> None:
+        backoff = POLL_INTERVAL
+        while True:
+            self.status = await ping(self.host, self.port)
+            for callback in list(self._subscribers):
+                try:
+                    callback(self.status)
+                except Exception as e:
+                    logging.error(f"Server status subscriber failed: {e}")
+            if self.status.online:
+                backoff = POLL_INTERVAL
+                await asyncio.sleep(POLL_INTERVAL)
+            else:
+                backoff = min(backoff * 2, MAX_BACKOFF)
+                await asyncio.sleep(backoff * random.uniform(0.8, 1.2))
+
+
+server_status = ServerStatusPoller(SERVER_IP)
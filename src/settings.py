@@ -1,8 +1,15 @@
 import os
 import json
+import atexit
+import logging
+import tempfile
+import threading
 
 from config import RAM_SIZE, JVM_ARGS, APPDATA_FOLDER
 
+# Seconds without changes before settings are written to disk
+SAVE_DELAY = 1.0
+
 
 class GameSettings:
     fullscreen: bool
@@ -11,6 +18,8 @@ class GameSettings:
     min_use_ram: int
     max_use_ram: int
     java_args: list[str]
+    auto_tune: bool
+    use_system_java: bool
 
     def from_dict(self, data: dict):
         self.fullscreen = data.get("fullscreen", False)
@@ -19,6 +28,8 @@ class GameSettings:
         self.min_use_ram = data.get("min_use_ram",  min(RAM_SIZE // 2, 6 * 1024))
         self.max_use_ram = data.get("max_use_ram", self.min_use_ram)
         self.java_args = data.get("java_args", JVM_ARGS)
+        self.auto_tune = data.get("auto_tune", False)
+        self.use_system_java = data.get("use_system_java", True)
 
     def to_dict(self) -> dict:
         return {
@@ -26,6 +37,8 @@ class GameSettings:
             "min_use_ram": self.min_use_ram,
             "max_use_ram": self.max_use_ram,
             "java_args": self.java_args,
+            "auto_tune": self.auto_tune,
+            "use_system_java": self.use_system_java,
         }
 
 
@@ -47,10 +60,20 @@ class Settings:
 
         self.game = GameSettings()
 
+        # Contents of settings.json as last saved, kept for other modpacks' settings
+        self._data = {}
+        self._flushed_data = None
+        self._flushed_fullscreen = None
+        self._lock = threading.Lock()
+        self._timer = None
+        atexit.register(self.flush)
+
     def load(self):
         if os.path.exists(self._settings_file):
             with open(self._settings_file, "r") as f:
                 data = json.load(f)
+                self._data = data
+                self._flushed_data = json.dumps(data, indent=4)
 
                 launcher_data = data.get("launcher", {})
                 minecraft_data = data.get("minecraft", {})
@@ -75,16 +98,19 @@ class Settings:
                 if not os.path.exists(self.minecraft_directory):
                     os.makedirs(self.minecraft_directory)
         else:
+            self.game.from_dict({})
             self.save()
 
     def save(self):
-        with open(self._settings_file, "r") as f:
-            data = json.load(f)
-            other_modpacks_settings = {
-                k: v
-                for k, v in data.get("minecraft", {}).items()
-                if k != self.modpack_name and k != "directory"
-            }
+        """
+        Update the settings in memory and schedule a write to disk. Changes
+        made in quick succession are written once, after SAVE_DELAY.
+        """
+        other_modpacks_settings = {
+            k: v
+            for k, v in self._data.get("minecraft", {}).items()
+            if k != self.modpack_name and k != "directory"
+        }
 
         launcher_data = {
             "theme": self.launcher_theme,
@@ -103,40 +129,66 @@ class Settings:
                 "min_use_ram": self.game.min_use_ram,
                 "max_use_ram": self.game.max_use_ram,
                 "java_args": self.game.java_args,
+                "auto_tune": self.game.auto_tune,
+                "use_system_java": self.game.use_system_java,
             },
             **other_modpacks_settings,
             "directory": str(self.minecraft_directory),
         }
 
-        data = {
-            "launcher": launcher_data,
-            "minecraft": minecraft_data,
-        }
-        with open(self._settings_file, "w") as f:
-            json.dump(data, f, indent=4)
+        with self._lock:
+            self._data = {
+                "launcher": launcher_data,
+                "minecraft": minecraft_data,
+            }
+            if self._timer is not None:
+                self._timer.cancel()
+            self._timer = threading.Timer(SAVE_DELAY, self.flush)
+            self._timer.daemon = True
+            self._timer.start()
         if not os.path.exists(self.minecraft_directory):
             # Create the directory if it doesn't exist
             os.makedirs(self.minecraft_directory)
-        self._set_fullscreen()
+
+    def flush(self):
+        """Write pending changes now, e.g. before the game reads options.txt."""
+        with self._lock:
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+            data = json.dumps(self._data, indent=4)
+            try:
+                if data != self._flushed_data:
+                    _write_atomic(self._settings_file, data)
+                    self._flushed_data = data
+                if self.game.fullscreen != self._flushed_fullscreen:
+                    self._set_fullscreen()
+                    self._flushed_fullscreen = self.game.fullscreen
+            except OSError as e:
+                logging.error(f"Failed to save settings: {e}")
 
     def _set_fullscreen(self):
         # Set the Minecraft options to fullscreen
         if not os.path.exists(self.minecraft_options):
             # Create the file with the fullscreen option if it doesn't exist
-            with open(self.minecraft_options, "w") as f:
-                f.write(f"fullscreen:{str(self.game.fullscreen).lower()}\n")
+            os.makedirs(os.path.dirname(self.minecraft_options), exist_ok=True)
+            _write_atomic(
+                self.minecraft_options,
+                f"fullscreen:{str(self.game.fullscreen).lower()}\n",
+            )
             return
 
         with open(self.minecraft_options, "r") as f:
             lines = f.readlines()
 
         # apply fullscreen setting
-        with open(self.minecraft_options, "w") as f:
-            for line in lines:
-                if line.startswith("fullscreen:"):
-                    f.write(f"fullscreen:{str(self.game.fullscreen).lower()}\n")
-                else:
-                    f.write(line)
+        lines = [
+            f"fullscreen:{str(self.game.fullscreen).lower()}\n"
+            if line.startswith("fullscreen:")
+            else line
+            for line in lines
+        ]
+        _write_atomic(self.minecraft_options, "".join(lines))
 
     def _load_fullscreen(self):
         if not os.path.exists(self.minecraft_options):
@@ -150,11 +202,37 @@ class Settings:
             if line.startswith("fullscreen:"):
                 value = line.split(":", 1)[1].strip().lower()
                 self.game.fullscreen = value == "true"
+                self._flushed_fullscreen = self.game.fullscreen
                 return
         else:
             self.game.fullscreen = False
             self._set_fullscreen()
 
 
+def _write_atomic(path, data: str):
+    """
+    Write through a temporary file in the same folder and rename it over
+    the target, so a crash mid-write leaves the old file intact.
+    """
+    fd, temp_path = tempfile.mkstemp(
+        dir=os.path.dirname(path), prefix=f".{os.path.basename(path)}."
+    )
+    try:
+        with os.fdopen(fd, "w") as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        # mkstemp creates the file as 0600, keep the mode of the target
+        try:
+            mode = os.stat(path).st_mode & 0o777
+        except FileNotFoundError:
+            mode = 0o644
+        os.chmod(temp_path, mode)
+        os.replace(temp_path, path)
+    except BaseException:
+        os.unlink(temp_path)
+        raise
+
+
 settings = Settings()
 settings.load()
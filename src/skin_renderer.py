@@ -0,0 +1,279 @@
+import struct
+import zlib
+
+# Every texture pixel becomes a SCALE x SCALE block in the rendered previews
+SCALE = 8
+
+PNG_SIGNATURE = b"\x89PNG\r\n\x1a\n"
+
+
+class Image:
+    """RGBA image stored as a list of row bytearrays."""
+
+    def __init__(
+        self, width: int, height: int, rows: list[bytearray] | None = None
+    ):
+        self.width = width
+        self.height = height
+        self.rows = rows or [bytearray(width * 4) for _ in range(height)]
+
+    def crop(self, x: int, y: int, width: int, height: int) -> "Image":
+        return Image(
+            width,
+            height,
+            [
+                bytearray(row[x * 4 : (x + width) * 4])
+                for row in self.rows[y : y + height]
+            ],
+        )
+
+    def mirror(self) -> "Image":
+        rows = []
+        for row in self.rows:
+            pixels = [row[i : i + 4] for i in range(0, len(row), 4)]
+            rows.append(bytearray(b"".join(reversed(pixels))))
+        return Image(self.width, self.height, rows)
+
+    def is_opaque(self) -> bool:
+        return all(min(row[3::4]) == 255 for row in self.rows)
+
+    def paste(self, image: "Image", x: int, y: int, overlay: bool = False) -> None:
+        """
+        Copy image at x, y. Base layers are copied as is, overlays are
+        alpha blended on top of what is already there.
+        """
+        for dy, source in enumerate(image.rows):
+            target = self.rows[y + dy]
+            start = x * 4
+            if not overlay:
+                target[start : start + len(source)] = source
+                continue
+            for i in range(0, len(source), 4):
+                alpha = source[i + 3]
+                if alpha == 0:
+                    continue
+                if alpha == 255:
+                    target[start + i : start + i + 4] = source[i : i + 4]
+                    continue
+                for c in range(3):
+                    target[start + i + c] = (
+                        source[i + c] * alpha + target[start + i + c] * (255 - alpha)
+                    ) // 255
+                target[start + i + 3] = max(target[start + i + 3], alpha)
+
+    def scale(self, factor: int) -> "Image":
+        rows = []
+        for row in self.rows:
+            scaled = bytearray(
+                b"".join(row[i : i + 4] * factor for i in range(0, len(row), 4))
+            )
+            rows.extend(bytearray(scaled) for _ in range(factor))
+        return Image(self.width * factor, self.height * factor, rows)
+
+
+def _paeth(a: int, b: int, c: int) -> int:
+    p = a + b - c
+    pa, pb, pc = abs(p - a), abs(p - b), abs(p - c)
+    if pa <= pb and pa <= pc:
+        return a
+    return b if pb <= pc else c
+
+
+def _unfilter(data: bytes, width: int, height: int, bpp: int) -> list[bytearray]:
+    stride = width * bpp
+    rows = []
+    previous = bytearray(stride)
+    position = 0
+    for _ in range(height):
+        filter_type = data[position]
+        row = bytearray(data[position + 1 : position + 1 + stride])
+        position += 1 + stride
+        if filter_type == 1:
+            for i in range(bpp, stride):
+                row[i] = (row[i] + row[i - bpp]) & 0xFF
+        elif filter_type == 2:
+            row = bytearray((a + b) & 0xFF for a, b in zip(row, previous))
+        elif filter_type == 3:
+            for i in range(stride):
+                left = row[i - bpp] if i >= bpp else 0
+                row[i] = (row[i] + ((left + previous[i]) >> 1)) & 0xFF
+        elif filter_type == 4:
+            for i in range(stride):
+                left = row[i - bpp] if i >= bpp else 0
+                up_left = previous[i - bpp] if i >= bpp else 0
+                row[i] = (row[i] + _paeth(left, previous[i], up_left)) & 0xFF
+        elif filter_type != 0:
+            raise ValueError(f"Unknown PNG filter {filter_type}")
+        rows.append(row)
+        previous = row
+    return rows
+
+
+def decode_png(data: bytes) -> Image:
+    """
+    Decode an 8-bit non-interlaced PNG, which covers skin and cape textures,
+    into RGBA. Raises ValueError for anything else.
+    """
+    try:
+        return _decode_png(data)
+    except (struct.error, zlib.error, KeyError, IndexError, NameError) as e:
+        raise ValueError(f"Invalid PNG: {e}") from e
+
+
+def _decode_png(data: bytes) -> Image:
+    if not data.startswith(PNG_SIGNATURE):
+        raise ValueError("Not a PNG file")
+    position = len(PNG_SIGNATURE)
+    idat = b""
+    palette = b""
+    transparency = b""
+    while position < len(data):
+        length, chunk_type = struct.unpack(">I4s", data[position : position + 8])
+        chunk = data[position + 8 : position + 8 + length]
+        position += 12 + length
+        if chunk_type == b"IHDR":
+            width, height, depth, color_type, _, _, interlace = struct.unpack(
+                ">IIBBBBB", chunk
+            )
+        elif chunk_type == b"PLTE":
+            palette = chunk
+        elif chunk_type == b"tRNS":
+            transparency = chunk
+        elif chunk_type == b"IDAT":
+            idat += chunk
+        elif chunk_type == b"IEND":
+            break
+    if depth != 8 or interlace:
+        raise ValueError("Unsupported PNG format")
+    channels = {0: 1, 2: 3, 3: 1, 4: 2, 6: 4}[color_type]
+    rows = _unfilter(zlib.decompress(idat), width, height, channels)
+    if color_type == 6:
+        return Image(width, height, rows)
+
+    rgba_rows = []
+    for row in rows:
+        rgba = bytearray()
+        for i in range(0, len(row), channels):
+            if color_type == 0:
+                rgba += bytes((row[i], row[i], row[i], 255))
+            elif color_type == 4:
+                rgba += bytes((row[i], row[i], row[i], row[i + 1]))
+            elif color_type == 2:
+                rgba += row[i : i + 3] + b"\xff"
+            else:
+                index = row[i]
+                alpha = transparency[index] if index < len(transparency) else 255
+                rgba += palette[index * 3 : index * 3 + 3] + bytes((alpha,))
+        rgba_rows.append(rgba)
+    return Image(width, height, rgba_rows)
+
+
+def encode_png(image: Image) -> bytes:
+    def chunk(chunk_type: bytes, data: bytes) -> bytes:
+        return (
+            struct.pack(">I", len(data))
+            + chunk_type
+            + data
+            + struct.pack(">I", zlib.crc32(chunk_type + data))
+        )
+
+    raw = b"".join(b"\x00" + bytes(row) for row in image.rows)
+    return (
+        PNG_SIGNATURE
+        + chunk(
+            b"IHDR",
+            struct.pack(">IIBBBBB", image.width, image.height, 8, 6, 0, 0, 0),
+        )
+        + chunk(b"IDAT", zlib.compress(raw, 9))
+        + chunk(b"IEND", b"")
+    )
+
+
+def render_face(skin: Image) -> Image:
+    face = Image(8, 8)
+    face.paste(skin.crop(8, 8, 8, 8), 0, 0)
+    hat = skin.crop(40, 8, 8, 8)
+    # Old 64x32 skins often fill the hat layer with an opaque colour,
+    # the game ignores it in that case
+    if skin.height == 64 or not hat.is_opaque():
+        face.paste(hat, 0, 0, overlay=True)
+    return face.scale(SCALE)
+
+
+def render_body(
+    skin: Image, slim: bool = False, cape: Image | None = None, back: bool = False
+) -> Image:
+    """
+    Front or back view of the player, 16x32 texture pixels before scaling.
+    The cape is drawn over the back view.
+    """
+    arm = 3 if slim else 4
+    body = Image(16, 32)
+    if not back:
+        parts = [
+            # (x, y, width, height, target x, target y, legacy mirror source)
+            (8, 8, 8, 8, 4, 0, None),
+            (20, 20, 8, 12, 4, 8, None),
+            (44, 20, arm, 12, 4 - arm, 8, None),
+            (36, 52, arm, 12, 12, 8, (44, 20)),
+            (4, 20, 4, 12, 4, 20, None),
+            (20, 52, 4, 12, 8, 20, (4, 20)),
+        ]
+        overlays = [
+            (40, 8, 8, 8, 4, 0),
+            (20, 36, 8, 12, 4, 8),
+            (44, 36, arm, 12, 4 - arm, 8),
+            (52, 52, arm, 12, 12, 8),
+            (4, 36, 4, 12, 4, 20),
+            (4, 52, 4, 12, 8, 20),
+        ]
+    else:
+        parts = [
+            (24, 8, 8, 8, 4, 0, None),
+            (32, 20, 8, 12, 4, 8, None),
+            (44 + arm + 4, 20, arm, 12, 12, 8, None),
+            (36 + arm + 4, 52, arm, 12, 4 - arm, 8, (44 + arm + 4, 20)),
+            (12, 20, 4, 12, 8, 20, None),
+            (28, 52, 4, 12, 4, 20, (12, 20)),
+        ]
+        overlays = [
+            (56, 8, 8, 8, 4, 0),
+            (32, 36, 8, 12, 4, 8),
+            (44 + arm + 4, 36, arm, 12, 12, 8),
+            (52 + arm + 4, 52, arm, 12, 4 - arm, 8),
+            (12, 36, 4, 12, 8, 20),
+            (12, 52, 4, 12, 4, 20),
+        ]
+    for x, y, width, height, target_x, target_y, legacy_source in parts:
+        if skin.height == 32 and legacy_source is not None:
+            # Left limbs only exist on 64x64 skins, older skins mirror the right ones
+            part = skin.crop(*legacy_source, width, height).mirror()
+        else:
+            part = skin.crop(x, y, width, height)
+        body.paste(part, target_x, target_y)
+    for x, y, width, height, target_x, target_y in overlays:
+        if skin.height == 32 and y >= 32:
+            continue
+        layer = skin.crop(x, y, width, height)
+        if skin.height == 32 and layer.is_opaque():
+            continue
+        body.paste(layer, target_x, target_y, overlay=True)
+    if back and cape is not None:
+        # Capes are 64x32 or a multiple of it, the outer side is at 1,1 10x16
+        factor = cape.width // 64
+        cape_image = cape.crop(factor, factor, 10 * factor, 16 * factor)
+        if factor > 1:
+            cape_image = Image(
+                10,
+                16,
+                [
+                    bytearray(
+                        b"".join(
+                            row[i : i + 4] for i in range(0, len(row), 4 * factor)
+                        )
+                    )
+                    for row in cape_image.rows[::factor]
+                ],
+            )
+        body.paste(cape_image, 3, 8)
+    return body.scale(SCALE)
@@ -1,29 +1,117 @@
+import asyncio
+import json
+import logging
+import time
+from email.utils import parsedate_to_datetime
+
 import httpx
 
-from config import STATS_URL, STATS_API_VERSION
+from config import APPDATA_FOLDER, STATS_URL, STATS_API_VERSION
+
+# Seconds a fetched response is served without asking the server again
+STATS_TTL = 60
+# Seconds to wait after a rate limit without a usable Retry-After header
+DEFAULT_RETRY_AFTER = 60
 
 
 class Stats:
     def __init__(self):
         self._api_url = f"{STATS_URL}/{STATS_API_VERSION}"
         self._client = httpx.AsyncClient(base_url=self._api_url)
-        
+        self._cache_file = APPDATA_FOLDER / "stats_cache.json"
+        # uuid -> {"data": ..., "etag": ...}, persisted between launches
+        self._cache: dict[str, dict] = {}
+        # uuid -> monotonic time until which the cached value is fresh
+        self._expires: dict[str, float] = {}
+        self._in_flight: dict[str, asyncio.Task] = {}
+        self._retry_at = 0.0
+        self._load_cache()
+
+    def _load_cache(self):
+        if not self._cache_file.exists():
+            return
+        try:
+            with open(self._cache_file, "r") as f:
+                self._cache = json.load(f)
+        except (json.JSONDecodeError, OSError) as e:
+            logging.info(f"Failed to load stats cache: {e}")
+
+    def _save_cache(self):
+        try:
+            with open(self._cache_file, "w") as f:
+                json.dump(self._cache, f)
+        except OSError as e:
+            logging.info(f"Failed to save stats cache: {e}")
+
+    def get_cached_player_stats(self, uuid: str):
+        """
+        Last known player stats, available before any request is made.
+        """
+        return self._cache.get(uuid, {}).get("data")
+
     async def get_player_stats(self, uuid: str):
         """
         Fetch player stats by UUID.
+
+        Fresh responses are served from the cache, concurrent callers share
+        one request and the last known value is returned while the API is
+        rate limited or unreachable.
         """
-        response = await self._client.get(
-            "/player",
-            params={"player": uuid}
-        )
-        # Raise an error if the request was unsuccessful
-        if response.status_code != 200:
+        if time.monotonic() < self._expires.get(uuid, 0):
+            return self.get_cached_player_stats(uuid)
+        if time.monotonic() < self._retry_at:
+            return self.get_cached_player_stats(uuid)
+        task = self._in_flight.get(uuid)
+        if task is None:
+            task = asyncio.create_task(self._fetch_player_stats(uuid))
+            self._in_flight[uuid] = task
+            task.add_done_callback(lambda _: self._in_flight.pop(uuid, None))
+        return await asyncio.shield(task)
+
+    async def _fetch_player_stats(self, uuid: str):
+        cached = self._cache.get(uuid, {})
+        headers = {"If-None-Match": cached["etag"]} if cached.get("etag") else {}
+        try:
+            response = await self._client.get(
+                "/player", params={"player": uuid}, headers=headers
+            )
+        except httpx.HTTPError as e:
+            logging.info(f"Failed to fetch player stats: {e}")
+            return cached.get("data")
+
+        if response.status_code == 304:
+            self._expires[uuid] = time.monotonic() + STATS_TTL
+            return cached.get("data")
+        if response.status_code in (429, 503):
             # rate limit exceeded
-            return None
+            self._retry_at = time.monotonic() + self._get_retry_after(response)
+            return cached.get("data")
+        if response.status_code != 200:
+            return cached.get("data")
         try:
-            return response.json()
+            data = response.json()
         except Exception:
-            return None
-    
+            return cached.get("data")
+
+        self._cache[uuid] = {"data": data, "etag": response.headers.get("ETag")}
+        self._expires[uuid] = time.monotonic() + STATS_TTL
+        await asyncio.to_thread(self._save_cache)
+        return data
+
+    @staticmethod
+    def _get_retry_after(response: httpx.Response) -> float:
+        retry_after = response.headers.get("Retry-After")
+        if retry_after is None:
+            reset = response.headers.get("X-RateLimit-Reset")
+            if reset and reset.isdigit():
+                return max(0, int(reset) - time.time())
+            return DEFAULT_RETRY_AFTER
+        if retry_after.isdigit():
+            return int(retry_after)
+        try:
+            return max(0, parsedate_to_datetime(retry_after).timestamp() - time.time())
+        except (TypeError, ValueError):
+            return DEFAULT_RETRY_AFTER
+
 
-stats = Stats()
\ No newline at end of file
+stats = Stats()
@@ -0,0 +1,113 @@
+import ctypes
+import logging
+import os
+import threading
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+# Folder inside the directory being cleared, so moving into it is a rename
+TRASH_FOLDER_NAME = ".trash"
+DELETE_WORKERS = 4
+# SetThreadPriority value that puts the calling thread in background mode
+THREAD_MODE_BACKGROUND_BEGIN = 0x00010000
+
+
+class Trash:
+    """
+    Clears a directory by renaming its contents into a trash folder, which
+    returns immediately, and deleting the trash in a low priority
+    background thread. Trash left by a closed launcher is deleted on resume.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._workers: dict[Path, threading.Thread] = {}
+
+    def clear(self, directory: str | Path) -> None:
+        directory = Path(directory)
+        batch = directory / TRASH_FOLDER_NAME / uuid.uuid4().hex
+        batch.mkdir(parents=True)
+        for entry in os.scandir(directory):
+            if entry.name == TRASH_FOLDER_NAME:
+                continue
+            os.rename(entry.path, batch / entry.name)
+        self.resume(directory)
+
+    def resume(self, directory: str | Path) -> None:
+        """Start deleting the trash of directory, if there is any."""
+        trash_folder = Path(directory) / TRASH_FOLDER_NAME
+        if not trash_folder.exists():
+            return
+        with self._lock:
+            worker = self._workers.get(trash_folder)
+            if worker is not None and worker.is_alive():
+                return
+            worker = threading.Thread(
+                target=self._empty, args=(trash_folder,), daemon=True
+            )
+            self._workers[trash_folder] = worker
+            worker.start()
+
+    @staticmethod
+    def _empty(trash_folder: Path) -> None:
+        lower_thread_priority()
+        while True:
+            files = []
+            directories = []
+            for root, dirs, filenames in os.walk(trash_folder):
+                directories.append(root)
+                for name in dirs:
+                    path = os.path.join(root, name)
+                    if os.path.islink(path):
+                        files.append(path)
+                files.extend(os.path.join(root, name) for name in filenames)
+            failed = 0
+            with ThreadPoolExecutor(max_workers=DELETE_WORKERS) as executor:
+                for path, error in zip(files, executor.map(_unlink, files)):
+                    if error:
+                        failed += 1
+                        logging.info(f"Failed to delete {path}: {error}")
+            # deepest folders first
+            for directory in reversed(directories):
+                try:
+                    os.rmdir(directory)
+                except OSError:
+                    pass
+            if not trash_folder.exists():
+                break
+            # new batches could have been added while deleting, files that
+            # are still locked are left for the next start
+            if failed == len(files):
+                break
+        logging.info(f"Emptied {trash_folder}")
+
+
+def lower_thread_priority() -> None:
+    """Run the calling thread at the lowest priority, where supported."""
+    if os.name == "nt":
+        kernel32 = ctypes.windll.kernel32
+        # background mode also lowers the disk and memory priority
+        if not kernel32.SetThreadPriority(
+            kernel32.GetCurrentThread(), THREAD_MODE_BACKGROUND_BEGIN
+        ):
+            logging.info("Failed to lower the thread priority")
+    elif hasattr(os, "setpriority"):
+        try:
+            # on Linux the niceness applies to this thread only
+            os.setpriority(os.PRIO_PROCESS, threading.get_native_id(), 19)
+        except OSError:
+            pass
+
+
+def _unlink(path: str) -> OSError | None:
+    try:
+        os.unlink(path)
+    except FileNotFoundError:
+        pass
+    except OSError as e:
+        return e
+    return None
+
+
+trash = Trash()
@@ -0,0 +1,227 @@
+import hashlib
+import json
+import logging
+import os
+import shutil
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import httpx
+import minecraft_launcher_lib as mcl
+
+from minecraft_launcher_lib._helper import (
+    check_path_inside_minecraft_directory,
+    get_user_agent,
+)
+from override_sync import SyncCancelled, override_sync
+from trash import lower_thread_priority
+
+# Next to the modpack folders, so applying a staged file is a rename
+STAGING_FOLDER_NAME = ".staging"
+MANIFEST_FILE_NAME = ".staged.json"
+# Staging runs in the background, it shouldn't take all the bandwidth
+STAGE_WORKERS = 2
+DOWNLOAD_CHUNK_SIZE = 1024 * 64
+
+
+class UpdateStaging:
+    """
+    Downloads a modpack update as soon as it is found, in a low priority
+    thread. Files the new version adds or changes are put in a staging
+    folder with the layout of the modpack, so Update only has to move them
+    in. A manifest records the staged version, and once staging is complete
+    the override file names. Files are only put in place once they are
+    downloaded and verified, so an unfinished staging is still usable.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._workers: dict[str, threading.Thread] = {}
+        self._cancelled: dict[str, threading.Event] = {}
+
+    @staticmethod
+    def staging_path(modpack_path: Path) -> Path:
+        return modpack_path.parent / STAGING_FOLDER_NAME / modpack_path.name
+
+    def start(
+        self, name: str, branch: str, version: str, index: dict, modpack_path: Path
+    ) -> None:
+        """Start staging version, unless it is staged or being staged."""
+        if self._staged_manifest(modpack_path, version) is not None:
+            return
+        with self._lock:
+            worker = self._workers.get(name)
+            if worker is not None and worker.is_alive():
+                return
+            cancelled = threading.Event()
+            worker = threading.Thread(
+                target=self._stage,
+                args=(name, branch, version, index, modpack_path, cancelled),
+                daemon=True,
+            )
+            self._workers[name] = worker
+            self._cancelled[name] = cancelled
+            worker.start()
+
+    def apply(self, name: str, version: str, modpack_path: Path) -> list[str] | None:
+        """
+        Move the files staged for version into the modpack. Returns the
+        override file names when staging was complete, None when the update
+        still has to download the rest. Staging that is still running is
+        cancelled, the files it finished are kept.
+        """
+        self._cancel(name)
+        staging = self.staging_path(modpack_path)
+        manifest = self._read_manifest(modpack_path)
+        if manifest.get("version") != version:
+            shutil.rmtree(staging, ignore_errors=True)
+            return None
+        os.unlink(staging / MANIFEST_FILE_NAME)
+        moved = 0
+        for root, _, filenames in os.walk(staging):
+            relative_root = os.path.relpath(root, staging)
+            for file_name in filenames:
+                # downloads that were cancelled halfway
+                if file_name.endswith(".part"):
+                    continue
+                target = os.path.join(modpack_path, relative_root, file_name)
+                os.makedirs(os.path.dirname(target), exist_ok=True)
+                os.replace(os.path.join(root, file_name), target)
+                moved += 1
+        shutil.rmtree(staging, ignore_errors=True)
+        logging.info(f"Applied {moved} staged files of {name} {version}")
+        if not manifest.get("complete"):
+            return None
+        return manifest["overrides"]
+
+    def _cancel(self, name: str) -> None:
+        with self._lock:
+            cancelled = self._cancelled.get(name)
+            worker = self._workers.get(name)
+        if cancelled is not None:
+            cancelled.set()
+        # downloads check the event between chunks, this returns quickly
+        if worker is not None and worker is not threading.current_thread():
+            worker.join()
+
+    def _read_manifest(self, modpack_path: Path) -> dict:
+        path = self.staging_path(modpack_path) / MANIFEST_FILE_NAME
+        if not path.exists():
+            return {}
+        try:
+            with open(path, "r") as f:
+                return json.load(f)
+        except (json.JSONDecodeError, OSError):
+            return {}
+
+    def _staged_manifest(self, modpack_path: Path, version: str) -> dict | None:
+        manifest = self._read_manifest(modpack_path)
+        if manifest.get("version") != version or not manifest.get("complete"):
+            return None
+        return manifest
+
+    def _stage(
+        self,
+        name: str,
+        branch: str,
+        version: str,
+        index: dict,
+        modpack_path: Path,
+        cancelled: threading.Event,
+    ) -> None:
+        lower_thread_priority()
+        staging = self.staging_path(modpack_path)
+        manifest_path = staging / MANIFEST_FILE_NAME
+        # Files of an interrupted run for this version are kept
+        if self._read_manifest(modpack_path).get("version") != version:
+            shutil.rmtree(staging, ignore_errors=True)
+        staging.mkdir(parents=True, exist_ok=True)
+        with open(manifest_path, "w") as f:
+            json.dump({"version": version, "complete": False}, f)
+
+        def stage_mod(file: dict, session: httpx.Client) -> None:
+            if cancelled.is_set():
+                return
+            installed = modpack_path / file["path"]
+            sha1 = file["hashes"]["sha1"]
+            if installed.exists() and _sha1_file(installed) == sha1:
+                return
+            staged = os.path.abspath(staging / file["path"])
+            check_path_inside_minecraft_directory(staging, staged)
+            # already downloaded by an earlier, interrupted run
+            if os.path.exists(staged) and _sha1_file(staged) == sha1:
+                return
+            _download_mod(file["downloads"][0], staged, sha1, session, cancelled)
+
+        session = httpx.Client(follow_redirects=True, timeout=60)
+        try:
+            files = mcl.mrpack._filter_mrpack_files(index["files"], {})
+            with ThreadPoolExecutor(
+                max_workers=STAGE_WORKERS, initializer=lower_thread_priority
+            ) as executor:
+                for future in [
+                    executor.submit(stage_mod, file, session) for file in files
+                ]:
+                    future.result()
+            if cancelled.is_set():
+                return
+            overrides = override_sync.sync(
+                name,
+                branch,
+                modpack_path,
+                destination=staging,
+                cancelled=cancelled,
+                max_workers=STAGE_WORKERS,
+                initializer=lower_thread_priority,
+            )
+            with open(manifest_path, "w") as f:
+                json.dump(
+                    {"version": version, "complete": True, "overrides": overrides}, f
+                )
+            logging.info(f"Staged {name} {version}")
+        except SyncCancelled:
+            logging.info(f"Staging of {name} {version} was cancelled")
+        except (httpx.HTTPError, OSError, ValueError, KeyError) as e:
+            # Update downloads whatever is missing
+            logging.info(f"Failed to stage {name} {version}: {e}")
+        finally:
+            session.close()
+
+
+def _download_mod(
+    url: str, path: str, sha1: str, session: httpx.Client, cancelled: threading.Event
+) -> None:
+    """Download to a .part file that only replaces path once it is verified."""
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    part = f"{path}.part"
+    hasher = hashlib.sha1()
+    try:
+        with session.stream(
+            "GET", url, headers={"user-agent": get_user_agent()}
+        ) as response:
+            response.raise_for_status()
+            with open(part, "wb") as f:
+                for chunk in response.iter_bytes(DOWNLOAD_CHUNK_SIZE):
+                    if cancelled.is_set():
+                        raise SyncCancelled(f"Download of {url} was cancelled")
+                    f.write(chunk)
+                    hasher.update(chunk)
+        if hasher.hexdigest() != sha1:
+            raise ValueError(f"Hash mismatch for {url}")
+        os.replace(part, path)
+    except BaseException:
+        if os.path.exists(part):
+            os.unlink(part)
+        raise
+
+
+def _sha1_file(path: str | os.PathLike) -> str:
+    sha1 = hashlib.sha1()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b""):
+            sha1.update(chunk)
+    return sha1.hexdigest()
+
+
+update_staging = UpdateStaging()
@@ -1,11 +1,16 @@
 import os
 import sys
+import asyncio
+import zlib
 import shutil
+import struct
+import hashlib
 import httpx
 import logging
 import subprocess
 
-
+from delta import apply_delta
+from github_api import github_api
 from config import (
     LATEST_LAUNCHER_RELEASE_URL,
     LAUNCHER_VERSION,
@@ -16,12 +21,17 @@ from config import (
     MEIPASS_FOLDER_NAME,
 )
 
+DOWNLOAD_CHUNK_SIZE = 1024 * 1024
+
 
 class Updater:
     def __init__(self):
         self.version = LAUNCHER_VERSION
         self.releases_url = LATEST_LAUNCHER_RELEASE_URL
         self.latest_download_url = ""
+        self.latest_digest = None
+        self.latest_delta_url = ""
+        self.latest_delta_digest = None
         self.latest_version = ""
         self.update_available = False
         self.temp_dir = APPDATA_FOLDER / "temp"
@@ -39,37 +49,107 @@ class Updater:
         return self.update_available
 
     async def get_latest_version(self) -> str:
-        async with httpx.AsyncClient() as client:
-            response = await client.get(self.releases_url)
-            if response.status_code != 200:
-                logging.error(f"Failed to check for updates: {response.status_code}")
-                return ""
-            self.latest_release = response.json()
-            self.latest_version = self.latest_release["tag_name"]
-            # set latest_download_url to the first asset in the assets list by SYSTEM_OS
-            for asset in self.latest_release["assets"]:
-                if SYSTEM_OS == "Windows" and asset["name"].endswith(".exe"):
-                    self.latest_download_url = asset["browser_download_url"]
-                    self.executable = asset["name"]
-                    break
-                elif SYSTEM_OS == "Linux" and not asset["name"].endswith(".exe"):
-                    self.latest_download_url = asset["browser_download_url"]
-                    self.executable = asset["name"]
-                    break
+        try:
+            # conditional on the cached release, a 304 costs no budget
+            self.latest_release = await asyncio.to_thread(
+                github_api.get, self.releases_url
+            )
+        except httpx.HTTPError as e:
+            logging.error(f"Failed to check for updates: {e}")
+            return ""
+        self.latest_version = self.latest_release["tag_name"]
+        # set latest_download_url to the first asset in the assets list by SYSTEM_OS
+        for asset in self.latest_release["assets"]:
+            if asset["name"].endswith((".delta", ".sha256")):
+                continue
+            if SYSTEM_OS == "Windows" and asset["name"].endswith(".exe"):
+                self.latest_download_url = asset["browser_download_url"]
+                self.latest_digest = asset.get("digest")
+                self.executable = asset["name"]
+                break
+            elif SYSTEM_OS == "Linux" and not asset["name"].endswith(".exe"):
+                self.latest_download_url = asset["browser_download_url"]
+                self.latest_digest = asset.get("digest")
+                self.executable = asset["name"]
+                break
+        # a delta is only usable against the version that is running
+        self.latest_delta_url = ""
+        delta_name = f"{getattr(self, 'executable', '')}-{self.version}.delta"
+        for asset in self.latest_release["assets"]:
+            if asset["name"] == delta_name:
+                self.latest_delta_url = asset["browser_download_url"]
+                self.latest_delta_digest = asset.get("digest")
 
         return self.latest_version
 
     def download_update(self):
+        executable_path = os.path.join(self.temp_dir, f"{self.executable}")
         with httpx.Client(follow_redirects=True) as client:
-            response = client.get(self.latest_download_url)
-            if response.status_code != 200:
-                logging.error(f"Failed to download update: {response.status_code}")
-                return
-            with open(os.path.join(self.temp_dir, f"{self.executable}"), "wb") as f:
-                f.write(response.content)
+            if not (
+                self.latest_delta_url and self._apply_delta(client, executable_path)
+            ):
+                try:
+                    self._download(
+                        client,
+                        self.latest_download_url,
+                        executable_path,
+                        self.latest_digest,
+                    )
+                except (httpx.HTTPError, ValueError) as e:
+                    logging.error(f"Failed to download update: {e}")
+                    return
         logging.info("Update downloaded successfully.")
         self.replace_current_version()
 
+    @staticmethod
+    def _download(client: httpx.Client, url: str, path: str, digest: str | None):
+        """
+        Stream url to path, verifying the "sha256:<hex>" digest GitHub
+        publishes for release assets when it's known.
+        """
+        sha256 = hashlib.sha256()
+        part_path = f"{path}.part"
+        try:
+            with client.stream("GET", url) as response:
+                response.raise_for_status()
+                with open(part_path, "wb") as f:
+                    for chunk in response.iter_bytes(DOWNLOAD_CHUNK_SIZE):
+                        sha256.update(chunk)
+                        f.write(chunk)
+            if digest and digest != f"sha256:{sha256.hexdigest()}":
+                raise ValueError(f"Checksum mismatch for {url}")
+            os.replace(part_path, path)
+        except BaseException:
+            if os.path.exists(part_path):
+                os.remove(part_path)
+            raise
+
+    def _apply_delta(self, client: httpx.Client, path: str) -> bool:
+        """
+        Build the new executable from the running one and a delta patch.
+        Returns False when the full executable has to be downloaded instead.
+        """
+        delta_path = f"{path}.delta"
+        part_path = f"{path}.part"
+        try:
+            self._download(
+                client, self.latest_delta_url, delta_path, self.latest_delta_digest
+            )
+            with open(delta_path, "rb") as f:
+                delta = f.read()
+            os.remove(delta_path)
+            digest = apply_delta(delta, sys.executable, part_path)
+            if self.latest_digest and self.latest_digest != f"sha256:{digest}":
+                raise ValueError("Patched executable doesn't match the release")
+            os.replace(part_path, path)
+        except (httpx.HTTPError, OSError, ValueError, zlib.error, struct.error) as e:
+            if os.path.exists(part_path):
+                os.remove(part_path)
+            logging.info(f"Delta update failed, downloading full executable: {e}")
+            return False
+        logging.info("Update built from delta patch.")
+        return True
+
     def copy_meipass(self):
         # HACK: copy _MEIPASS to the temp directory
         if not os.path.exists(